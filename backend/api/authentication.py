@@ -0,0 +1,48 @@
+import pickle
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from api.cache import LRUCache
+
+TOKEN_CACHE_KEY = "auth-token:{}"
+# Token.generate_key: 20 случайных байт в hex.
+TOKEN_KEY_RE = re.compile(r"[0-9a-f]{40}")
+
+local_tokens = LRUCache(
+    settings.TOKEN_CACHE_LOCAL_SIZE, settings.TOKEN_CACHE_LOCAL_TIMEOUT
+)
+
+
+def forget_token(key):
+    local_tokens.delete(key)
+    cache.delete(TOKEN_CACHE_KEY.format(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication с кешем: локальный LRU процесса и общий кеш.
+
+    Сигналы из api.signals сбрасывают запись при удалении токена и
+    изменении пользователя. LRU других воркеров устаревает не дольше,
+    чем за TOKEN_CACHE_LOCAL_TIMEOUT секунд. Ключ не того вида
+    отклоняется до кеша: memcached не принимает длинные ключи и ключи с
+    пробелами.
+    """
+
+    def authenticate_credentials(self, key):
+        if not TOKEN_KEY_RE.fullmatch(key):
+            raise AuthenticationFailed(_("Invalid token."))
+        cached = local_tokens.get(key)
+        if cached is None:
+            cached = cache.get(TOKEN_CACHE_KEY.format(key))
+            if cached is None:
+                cached = pickle.dumps(super().authenticate_credentials(key))
+                cache.set(
+                    TOKEN_CACHE_KEY.format(key), cached, settings.TOKEN_CACHE_TIMEOUT
+                )
+            local_tokens.set(key, cached)
+        return pickle.loads(cached)
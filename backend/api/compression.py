@@ -0,0 +1,77 @@
+import gzip
+import hashlib
+
+import brotli
+import zstandard
+from django.conf import settings
+
+from api.cache import LRUCache
+
+ENCODERS = {
+    "zstd": lambda data, level: zstandard.ZstdCompressor(level=level).compress(data),
+    "br": lambda data, level: brotli.compress(data, quality=level),
+    "gzip": lambda data, level: gzip.compress(data, compresslevel=level, mtime=0),
+}
+
+compressed_bodies = LRUCache(
+    settings.COMPRESSION["CACHE_SIZE"], settings.COMPRESSION["CACHE_TIMEOUT"]
+)
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding: {кодировка: принимается ли}.
+
+    q=0 и некорректный q означают отказ от кодировки.
+    """
+    encodings = {}
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        accepted = True
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                accepted = float(q[2:]) > 0
+            except ValueError:
+                accepted = False
+        encodings[coding] = accepted
+    return encodings
+
+
+def choose_encoding(request, available):
+    """Первая из available кодировок, которую принимает клиент, или None.
+
+    "*" покрывает только кодировки, не перечисленные в заголовке явно:
+    gzip;q=0, * не выбирает gzip.
+    """
+    accepted = accepted_encodings(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+    for encoding in available:
+        if accepted.get(encoding, accepted.get("*", False)):
+            return encoding
+    return None
+
+
+def compress(content, encoding, level):
+    return ENCODERS[encoding](content, level)
+
+
+def compress_cached(content, encoding):
+    """Сжимает тело ответа уровнем из COMPRESSION["LEVELS"].
+
+    Результат запоминается по хешу содержимого, поэтому одинаковые ответы,
+    собранные из кеша, не сжимаются заново. Тела больше CACHE_MAX_BODY
+    (например, списки покупок) не кешируются, так что кеш воркера занимает
+    не больше CACHE_SIZE * CACHE_MAX_BODY байт.
+    """
+    if len(content) > settings.COMPRESSION["CACHE_MAX_BODY"]:
+        return compress(content, encoding, settings.COMPRESSION["LEVELS"][encoding])
+    key = (encoding, hashlib.blake2b(content, digest_size=16).digest())
+    compressed = compressed_bodies.get(key)
+    if compressed is None:
+        compressed = compress(
+            content, encoding, settings.COMPRESSION["LEVELS"][encoding]
+        )
+        compressed_bodies.set(key, compressed)
+    return compressed
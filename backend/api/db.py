@@ -0,0 +1,31 @@
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+request_wrappers = ContextVar("request_execute_wrappers", default=())
+
+
+@contextmanager
+def execute_wrapper(wrapper):
+    """Аналог connection.execute_wrapper для текущего запроса.
+
+    Обёртка хранится в contextvar, а не в соединении потока: под ASGI
+    ORM выполняется через sync_to_async в другом потоке, куда контекст
+    запроса копируется.
+    """
+    token = request_wrappers.set(request_wrappers.get() + (wrapper,))
+    try:
+        yield
+    finally:
+        request_wrappers.reset(token)
+
+
+def execute(execute, sql, params, many, context):
+    for wrapper in reversed(request_wrappers.get()):
+        execute = functools.partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+def install(connection):
+    if execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute)
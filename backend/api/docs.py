@@ -0,0 +1,41 @@
+"""Маршруты документации API.
+
+drf_yasg импортируется только отсюда и только при API_DOCS_ENABLED:
+UI получает готовую схему из статики, собранную build_openapi_schema.
+"""
+
+from django.urls import path
+
+
+def api_info():
+    from drf_yasg import openapi
+
+    return openapi.Info(
+        title="Foodgram API",
+        default_version="v1",
+        description="API для проекта Foodgram",
+        terms_of_service="https://www.google.com/policies/terms/",
+        contact=openapi.Contact(email="contact@foodgram.local"),
+        license=openapi.License(name="BSD License"),
+    )
+
+
+def docs_urlpatterns():
+    from drf_yasg.views import get_schema_view
+    from rest_framework import permissions
+
+    schema_view = get_schema_view(
+        api_info(), public=True, permission_classes=(permissions.AllowAny,)
+    )
+    return [
+        path(
+            "docs/",
+            schema_view.with_ui("swagger", cache_timeout=0),
+            name="schema-swagger-ui",
+        ),
+        path(
+            "redoc/",
+            schema_view.with_ui("redoc", cache_timeout=0),
+            name="schema-redoc",
+        ),
+    ]
@@ -0,0 +1,368 @@
+import asyncio
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+from urllib.parse import parse_qs
+
+import orjson
+import psycopg2
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.db import connection, connections, transaction
+from django.http import JsonResponse
+from django.utils.module_loading import import_string
+from psycopg2 import sql
+from rest_framework.exceptions import AuthenticationFailed
+
+from api import memberships, metrics
+from api.authentication import CachedTokenAuthentication
+
+User = get_user_model()
+
+logger = logging.getLogger(__name__)
+
+RECIPE = "recipe"
+TICKET_SALT = "api.events.ticket"
+
+
+def user_topic(user_id):
+    return f"user:{user_id}"
+
+
+def author_topic(author_id):
+    return f"author:{author_id}"
+
+
+def encode(event):
+    return b"event: %s\ndata: %s\n\n" % (
+        event["type"].encode(),
+        orjson.dumps(event),
+    )
+
+
+class Subscriber:
+    """Очередь событий одного SSE-соединения.
+
+    Если клиент не успевает читать и очередь заполнилась, новые события
+    отбрасываются, а клиенту уходит resync: перечитать данные целиком.
+    """
+
+    def __init__(self, topics):
+        self.topics = set(topics)
+        self.queue = asyncio.Queue(settings.EVENTS["QUEUE_SIZE"])
+        self.lost = False
+
+    def put(self, item):
+        if self.queue.full():
+            self.lost = True
+        else:
+            self.queue.put_nowait(item)
+
+
+class Hub:
+    """Рассылка событий подписчикам внутри процесса.
+
+    Подписчики живут в цикле событий воркера, dispatch можно вызывать из
+    любого потока. Событие кодируется один раз на всех подписчиков темы.
+    """
+
+    def __init__(self):
+        self.topics = defaultdict(set)
+        self.loop = None
+
+    def subscribe(self, subscriber):
+        self.loop = asyncio.get_running_loop()
+        for topic in subscriber.topics:
+            self.topics[topic].add(subscriber)
+
+    def unsubscribe(self, subscriber):
+        for topic in subscriber.topics:
+            self._discard(topic, subscriber)
+
+    def add_topic(self, subscriber, topic):
+        subscriber.topics.add(topic)
+        self.topics[topic].add(subscriber)
+
+    def remove_topic(self, subscriber, topic):
+        subscriber.topics.discard(topic)
+        self._discard(topic, subscriber)
+
+    def dispatch(self, topic, event):
+        if self.loop is not None and topic in self.topics:
+            self.loop.call_soon_threadsafe(self._deliver, topic, event)
+
+    def _deliver(self, topic, event):
+        subscribers = self.topics.get(topic)
+        if subscribers:
+            item = (event, encode(event))
+            for subscriber in subscribers:
+                subscriber.put(item)
+
+    def _discard(self, topic, subscriber):
+        subscribers = self.topics.get(topic)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self.topics[topic]
+
+
+hub = Hub()
+
+
+class NullBackend:
+    """Без доставки: под WSGI потока событий нет и слушать некому.
+
+    publish() с этим бэкендом не делает ничего, даже on_commit.
+    """
+
+    enabled = False
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    def start(self):
+        pass
+
+    def publish(self, topic, event):
+        pass
+
+
+class LocalBackend(NullBackend):
+    """Доставка событий только внутри процесса.
+
+    Заменяет межпроцессный бэкенд в разработке и при одном воркере.
+    """
+
+    enabled = True
+
+    def publish(self, topic, event):
+        self.hub.dispatch(topic, event)
+
+
+class PostgresBackend(LocalBackend):
+    """Доставка событий между воркерами через LISTEN/NOTIFY PostgreSQL.
+
+    Публикация выполняет pg_notify в соединении запроса. Воркер, у
+    которого есть SSE-клиенты, держит отдельное соединение с LISTEN в
+    фоновом потоке и передаёт уведомления в hub, в том числе свои.
+    """
+
+    def __init__(self, hub):
+        super().__init__(hub)
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(
+                    target=self._listen, name="events-listener", daemon=True
+                )
+                self._listener.start()
+
+    def publish(self, topic, event):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_notify(%s, %s)",
+                [settings.EVENTS["CHANNEL"], orjson.dumps([topic, event]).decode()],
+            )
+
+    def _listen(self):
+        while True:
+            try:
+                self._listen_once()
+            except Exception:
+                logger.exception("Слушатель событий упал, перезапуск")
+                time.sleep(1)
+
+    def _dispatch(self, payload):
+        # Битое уведомление не должно останавливать поток слушателя.
+        try:
+            topic, event = orjson.loads(payload)
+            self.hub.dispatch(topic, event)
+        except Exception:
+            logger.exception("Не удалось разослать событие: %.200s", payload)
+
+    def _listen_once(self):
+        conn = psycopg2.connect(**connections["default"].get_connection_params())
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    sql.SQL("LISTEN {}").format(
+                        sql.Identifier(settings.EVENTS["CHANNEL"])
+                    )
+                )
+            while True:
+                if select.select([conn], [], [], 60) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    self._dispatch(conn.notifies.pop(0).payload)
+        finally:
+            conn.close()
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    return import_string(settings.EVENTS["BACKEND"])(hub)
+
+
+def publish(topic, event):
+    """Отправляет событие подписчикам темы после фиксации транзакции."""
+    backend = get_backend()
+    if backend.enabled:
+        transaction.on_commit(lambda: backend.publish(topic, event))
+
+
+def make_ticket(user):
+    """Короткоживущий подписанный билет на поток событий.
+
+    EventSource в браузере не умеет передавать заголовки, а токен API в
+    строке запроса попал бы в журналы прокси. Билет годится только для
+    /api/events/ и истекает через EVENTS["TICKET_MAX_AGE"] секунд.
+    """
+    return signing.TimestampSigner(salt=TICKET_SALT).sign(str(user.pk))
+
+
+def ticket_user(ticket):
+    try:
+        pk = signing.TimestampSigner(salt=TICKET_SALT).unsign(
+            ticket, max_age=settings.EVENTS["TICKET_MAX_AGE"]
+        )
+    except signing.BadSignature:
+        return None
+    return User.objects.filter(pk=pk, is_active=True).first()
+
+
+def authenticate(scope):
+    """Пользователь по токену из Authorization или билету из ?ticket=."""
+    header = dict(scope["headers"]).get(b"authorization", b"").split()
+    if len(header) == 2 and header[0].lower() == b"token":
+        try:
+            user, _ = CachedTokenAuthentication().authenticate_credentials(
+                header[1].decode()
+            )
+        except AuthenticationFailed:
+            return None
+        return user
+    ticket = parse_qs(scope["query_string"].decode()).get("ticket", [None])[0]
+    return ticket_user(ticket) if ticket else None
+
+
+def initial_topics(user):
+    following = memberships.get_memberships(user)[memberships.FOLLOWING]
+    return [user_topic(user.pk), *(author_topic(pk) for pk in following)]
+
+
+class EventStream:
+    """ASGI-приложение для settings.EVENTS["PATH"], остальное уходит в Django.
+
+    Django 3.2 отдаёт StreamingHttpResponse синхронным итератором прямо в
+    цикле событий, поэтому длинный поток Server-Sent Events обслуживается
+    здесь, до Django. Клиент получает события своей темы (избранное,
+    корзина, подписки) и тем авторов, на которых подписан (новые рецепты).
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] != settings.EVENTS["PATH"]:
+            return await self.application(scope, receive, send)
+        if scope["method"] != "GET":
+            return await self.reply(send, 405, {"detail": "Метод не разрешён."})
+
+        user = await sync_to_async(authenticate)(scope)
+        if user is None:
+            return await self.reply(
+                send, 401, {"detail": "Учетные данные не были предоставлены."}
+            )
+
+        subscriber = Subscriber(await sync_to_async(initial_topics)(user))
+        get_backend().start()
+        hub.subscribe(subscriber)
+        metrics.EVENT_STREAMS.inc()
+        try:
+            await self.stream(subscriber, receive, send)
+        finally:
+            hub.unsubscribe(subscriber)
+            metrics.EVENT_STREAMS.dec()
+
+    async def stream(self, subscriber, receive, send):
+        config = settings.EVENTS
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream"),
+                    (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no"),
+                ],
+            }
+        )
+        await self.send_body(send, b"retry: %d\n\n" % config["RETRY"])
+
+        disconnect = asyncio.ensure_future(self.disconnected(receive))
+        try:
+            while True:
+                if subscriber.lost:
+                    while not subscriber.queue.empty():
+                        subscriber.queue.get_nowait()
+                    subscriber.lost = False
+                    await self.send_body(send, encode({"type": "resync"}))
+
+                get = asyncio.ensure_future(subscriber.queue.get())
+                done, _ = await asyncio.wait(
+                    {get, disconnect},
+                    timeout=config["HEARTBEAT"],
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if disconnect in done:
+                    get.cancel()
+                    return
+                if get not in done:
+                    get.cancel()
+                    await self.send_body(send, b": ping\n\n")
+                    continue
+
+                event, message = get.result()
+                if event["type"] == memberships.FOLLOWING:
+                    topic = author_topic(event["author"])
+                    if event["active"]:
+                        hub.add_topic(subscriber, topic)
+                    else:
+                        hub.remove_topic(subscriber, topic)
+                await self.send_body(send, message)
+        finally:
+            disconnect.cancel()
+
+    async def disconnected(self, receive):
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    async def send_body(self, send, body):
+        await send({"type": "http.response.body", "body": body, "more_body": True})
+
+    async def reply(self, send, status, data):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [(b"content-type", b"application/json")],
+            }
+        )
+        await send({"type": "http.response.body", "body": orjson.dumps(data)})
+
+
+def events_unavailable(request):
+    """/api/events/ под WSGI: держать поток в синхронном воркере нельзя."""
+    return JsonResponse(
+        {"detail": "События доступны только при SERVER_MODE=asgi."}, status=501
+    )
@@ -0,0 +1,43 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import ListSerializer
+
+
+def split_fields(value):
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+def requested_fields(request, available):
+    """Поля ответа по ?fields= и ?omit=, None если клиент их не ограничил."""
+    fields = split_fields(request.query_params.get("fields", ""))
+    omit = split_fields(request.query_params.get("omit", ""))
+    if not fields and not omit:
+        return None
+    unknown = (fields | omit) - set(available)
+    if unknown:
+        raise ValidationError(
+            {"fields": f"Неизвестные поля: {', '.join(sorted(unknown))}."}
+        )
+    return (fields or set(available)) - omit
+
+
+def wants(fields, *names):
+    """Нужно ли хоть одно из полей names при наборе fields."""
+    return fields is None or any(name in fields for name in names)
+
+
+class SparseFieldsetMixin:
+    """Оставляет в ответе только поля из context["fields"].
+
+    Действует только на сериализатор верхнего уровня, вложенные
+    сериализаторы отдаются целиком.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selected = self.context.get("fields")
+        parent = self.parent
+        if isinstance(parent, ListSerializer):
+            parent = parent.parent
+        if selected is None or parent is not None:
+            return fields
+        return {name: field for name, field in fields.items() if name in selected}
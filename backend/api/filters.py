@@ -1,7 +1,8 @@
 import django_filters
 from rest_framework.filters import SearchFilter
 
-from recipes.models import Favorite, Recipe, ShoppingCart
+from api.memberships import FAVORITES, SHOPPING_CART, get_memberships
+from recipes.models import Recipe
 
 
 class RecipeFilter(django_filters.FilterSet):
@@ -16,19 +17,15 @@ class RecipeFilter(django_filters.FilterSet):
     def filter_is_favorited(self, queryset, name, value):
         user = self.request.user
         if value and user.is_authenticated:
-            favorite_ids = Favorite.objects.filter(user=user).values_list(
-                "recipe_id", flat=True
-            )
-            return queryset.filter(id__in=favorite_ids)
+            favorite_ids = get_memberships(user)[FAVORITES]
+            return queryset.filter(id__in=list(favorite_ids))
         return queryset
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
         user = self.request.user
         if value and user.is_authenticated:
-            cart_ids = ShoppingCart.objects.filter(user=user).values_list(
-                "recipe_id", flat=True
-            )
-            return queryset.filter(id__in=cart_ids)
+            cart_ids = get_memberships(user)[SHOPPING_CART]
+            return queryset.filter(id__in=list(cart_ids))
         return queryset
 
 
@@ -0,0 +1,75 @@
+import datetime
+import timeit
+from decimal import Decimal
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from api.renderers import MessagePackRenderer, ORJSONRenderer
+from api.serializers import RecipeSerializer
+from recipes.models import Recipe
+
+RENDERERS = (JSONRenderer, ORJSONRenderer, MessagePackRenderer)
+
+
+class Command(BaseCommand):
+    help = "Сравнивает рендереры API на выдаче RecipeSerializer из текущей БД"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipes", type=int, default=100)
+        parser.add_argument("--repeat", type=int, default=200)
+
+    def handle(self, *args, **options):
+        request = APIRequestFactory().get("/api/recipes/")
+        request.user = AnonymousUser()
+        recipes = (
+            Recipe.objects.select_related("author")
+            .prefetch_related("recipe_ingredients__ingredient")
+            .order_by("-created")[: options["recipes"]]
+        )
+        results = RecipeSerializer(
+            recipes, many=True, context={"request": request}
+        ).data
+        if not results:
+            raise CommandError("В БД нет рецептов")
+        data = {"count": len(results), "next": None, "previous": None}
+        data["results"] = results
+
+        self.check_types()
+        expected = JSONRenderer().render(data)
+        for renderer_class in RENDERERS:
+            renderer = renderer_class()
+            body = renderer.render(data)
+            seconds = min(
+                timeit.repeat(
+                    lambda: renderer.render(data), number=1, repeat=options["repeat"]
+                )
+            )
+            line = (
+                f"{renderer_class.__name__:20} {seconds * 1000:7.3f} мс {len(body):8} Б"
+            )
+            if renderer.media_type == JSONRenderer.media_type and body != expected:
+                line += "  вывод отличается от JSONRenderer"
+            self.stdout.write(line)
+
+    def check_types(self):
+        """Значения, которых нет в выдаче сериализаторов, но есть в ответах."""
+        now = timezone.now().replace(microsecond=123456)
+        data = {
+            "datetime": now,
+            "naive": now.replace(tzinfo=None),
+            "date": now.date(),
+            "time": datetime.time(12, 30, 15, 123456),
+            "decimal": Decimal("1.50"),
+            "timedelta": datetime.timedelta(seconds=90),
+            "text": "строка ",
+        }
+        expected = JSONRenderer().render(data)
+        if ORJSONRenderer().render(data) != expected:
+            raise CommandError(
+                f"ORJSONRenderer расходится с JSONRenderer:\n"
+                f"{ORJSONRenderer().render(data)}\n{expected}"
+            )
@@ -0,0 +1,106 @@
+from collections import Counter, defaultdict
+
+from django.core.management.base import BaseCommand
+
+from api.profiling import (
+    ALLOCATIONS_SUFFIX,
+    list_profiles,
+    load_allocations,
+    load_profile,
+    profile_route,
+)
+
+
+class Command(BaseCommand):
+    help = "Показывает сохранённые профили запросов и агрегирует их по маршрутам"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--route", help="Только профили этого маршрута")
+        parser.add_argument(
+            "--aggregate",
+            action="store_true",
+            help="Сводка по маршрутам с самыми затратными функциями",
+        )
+        parser.add_argument(
+            "--collapsed",
+            action="store_true",
+            help="Вывести объединённые стеки в формате collapsed stacks",
+        )
+        parser.add_argument(
+            "--memory",
+            action="store_true",
+            help="Работать со снимками памяти tracemalloc вместо профилей CPU",
+        )
+        parser.add_argument("--top", type=int, default=10)
+
+    def handle(self, *args, **options):
+        if options["memory"]:
+            return self.handle_memory(options)
+
+        profiles = [
+            name
+            for name in list_profiles()
+            if options["route"] in (None, profile_route(name))
+        ]
+
+        if options["collapsed"]:
+            stacks = Counter()
+            for name in profiles:
+                stacks.update(load_profile(name))
+            for stack, count in stacks.most_common():
+                self.stdout.write(f"{stack} {count}")
+            return
+
+        if not options["aggregate"]:
+            for name in profiles:
+                samples = sum(load_profile(name).values())
+                self.stdout.write(f"{name}\t{profile_route(name)}\t{samples}")
+            return
+
+        by_route = defaultdict(list)
+        for name in profiles:
+            by_route[profile_route(name)].append(load_profile(name))
+
+        for route, route_profiles in sorted(by_route.items()):
+            own = Counter()
+            total = 0
+            for stacks in route_profiles:
+                for stack, count in stacks.items():
+                    own[stack.rsplit(";", 1)[-1]] += count
+                    total += count
+            self.stdout.write(
+                f"{route}: профилей {len(route_profiles)}, сэмплов {total}"
+            )
+            for frame, count in own.most_common(options["top"]):
+                self.stdout.write(f"  {count / total:6.1%}  {frame}")
+
+    def handle_memory(self, options):
+        snapshots = [
+            name
+            for name in list_profiles(ALLOCATIONS_SUFFIX)
+            if options["route"] in (None, profile_route(name))
+        ]
+
+        if not options["aggregate"]:
+            for name in snapshots:
+                peak, net, _ = load_allocations(name)
+                self.stdout.write(f"{name}\t{profile_route(name)}\t{peak}\t{net}")
+            return
+
+        by_route = defaultdict(list)
+        for name in snapshots:
+            by_route[profile_route(name)].append(load_allocations(name))
+
+        for route, route_snapshots in sorted(by_route.items()):
+            sites = Counter()
+            for _, _, snapshot_sites in route_snapshots:
+                sites.update(snapshot_sites)
+            peaks = [peak for peak, _, _ in route_snapshots]
+            nets = [net for _, net, _ in route_snapshots]
+            self.stdout.write(
+                f"{route}: снимков {len(route_snapshots)}, "
+                f"пик макс. {max(peaks)} Б, ср. {sum(peaks) // len(peaks)} Б, "
+                f"остаток ср. {sum(nets) // len(nets)} Б"
+            )
+            for site, size in sites.most_common(options["top"]):
+                self.stdout.write(f"  {size // len(route_snapshots):>10} Б  {site}")
@@ -0,0 +1,139 @@
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseNotModified,
+    StreamingHttpResponse,
+)
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+
+def resolve(path):
+    """Путь к файлу внутри MEDIA_ROOT или Http404.
+
+    Отклоняет выход за MEDIA_ROOT, скрытые файлы и каталоги.
+    """
+    path = posixpath.normpath(path).lstrip("/")
+    parts = path.split("/")
+    if not path or any(part in ("", ".", "..") or part[0] == "." for part in parts):
+        raise Http404
+    fullpath = os.path.join(settings.MEDIA_ROOT, *parts)
+    if not os.path.isfile(fullpath):
+        raise Http404
+    return path, fullpath
+
+
+def parse_range(header, size):
+    """(start, end) одного диапазона Range, None если заголовок не подходит.
+
+    Несколько диапазонов не поддерживаются, такой запрос получает весь файл.
+    """
+    match = RANGE_RE.match(header)
+    if not match or match.groups() == ("", ""):
+        return None
+    start, end = match.groups()
+    if not start:
+        return max(size - int(end), 0), size - 1
+    if not end or int(end) >= size:
+        return int(start), size - 1
+    return int(start), int(end)
+
+
+def read_range(fullpath, start, length):
+    with open(fullpath, "rb") as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@require_safe
+def serve_media(request, path):
+    """Отдаёт файл из MEDIA_ROOT.
+
+    В продакшене публичный /media/ отдаёт nginx напрямую, сюда приходят
+    запросы без шлюза. С MEDIA_ACCEL_REDIRECT передача файла уходит в
+    internal location через X-Accel-Redirect, Range и ETag обрабатывает
+    nginx. Без него файл отдаётся через FileResponse (sendfile воркера) с
+    поддержкой ETag, If-Modified-Since и одного диапазона Range.
+    """
+    path, fullpath = resolve(path)
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    cache_control = f"public, max-age={settings.MEDIA_CACHE_MAX_AGE}"
+
+    if settings.MEDIA_ACCEL_REDIRECT:
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_REDIRECT + quote(path)
+        response["Cache-Control"] = cache_control
+        return response
+
+    stat = os.stat(fullpath)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(stat.st_mtime),
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+    }
+
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+    if_modified_since = parse_http_date_safe(
+        request.META.get("HTTP_IF_MODIFIED_SINCE", "")
+    )
+    if (if_none_match and etag in parse_etags(if_none_match)) or (
+        not if_none_match
+        and if_modified_since
+        and int(stat.st_mtime) <= if_modified_since
+    ):
+        response = HttpResponseNotModified()
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    byte_range = None
+    if "HTTP_RANGE" in request.META and request.META.get("HTTP_IF_RANGE", etag) == etag:
+        byte_range = parse_range(request.META["HTTP_RANGE"], stat.st_size)
+
+    if byte_range is None:
+        response = FileResponse(open(fullpath, "rb"), content_type=content_type)
+    elif byte_range[0] >= stat.st_size or byte_range[0] > byte_range[1]:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{stat.st_size}"
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            read_range(fullpath, start, end - start + 1),
+            status=206,
+            content_type=content_type,
+        )
+        response["Content-Length"] = end - start + 1
+        response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+async def serve_media_async(request, path):
+    """serve_media для ASGI.
+
+    stat и открытие файла выполняются в пуле потоков, не занимая поток
+    ORM, а тело ответа отдаёт цикл событий: медленный клиент не держит
+    поток воркера всё время загрузки.
+    """
+    return await sync_to_async(serve_media, thread_sensitive=False)(request, path)
@@ -0,0 +1,90 @@
+import time
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+
+from recipes.models import Favorite, ShoppingCart
+from users.models import Subscription
+
+FAVORITES = "favorites"
+SHOPPING_CART = "shopping_cart"
+FOLLOWING = "following"
+
+SOURCES = {
+    FAVORITES: (Favorite, "recipe_id"),
+    SHOPPING_CART: (ShoppingCart, "recipe_id"),
+    FOLLOWING: (Subscription, "author_id"),
+}
+
+VERSION_KEY = "memberships:{}:{}:version"
+IDS_KEY = "memberships:{}:{}:{}"
+
+
+class IdSet:
+    """Неизменяемое множество id в виде отсортированного array('q')."""
+
+    __slots__ = ("ids",)
+
+    def __init__(self, ids):
+        self.ids = ids
+
+    def __contains__(self, pk):
+        index = bisect_left(self.ids, pk)
+        return index < len(self.ids) and self.ids[index] == pk
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def get_memberships(user):
+    """Избранное, корзина и подписки пользователя из кеша.
+
+    Ключи множеств версионированы, поэтому устаревшее значение, записанное
+    параллельным запросом, никогда не будет прочитано после touch().
+    """
+    memberships = getattr(user, "_memberships", None)
+    if memberships is not None:
+        return memberships
+
+    version_keys = {kind: VERSION_KEY.format(user.pk, kind) for kind in SOURCES}
+    versions = cache.get_many(version_keys.values())
+    missing_versions = {
+        key: time.time_ns() for key in version_keys.values() if key not in versions
+    }
+    if missing_versions:
+        cache.set_many(missing_versions, None)
+        versions.update(missing_versions)
+
+    ids_keys = {
+        kind: IDS_KEY.format(user.pk, kind, versions[key])
+        for kind, key in version_keys.items()
+    }
+    cached = cache.get_many(ids_keys.values())
+
+    memberships = {}
+    for kind, key in ids_keys.items():
+        if key not in cached:
+            model, field = SOURCES[kind]
+            cached[key] = array(
+                "q",
+                sorted(model.objects.filter(user=user).values_list(field, flat=True)),
+            )
+            cache.set(key, cached[key], settings.MEMBERSHIP_CACHE_TIMEOUT)
+        memberships[kind] = IdSet(cached[key])
+
+    user._memberships = memberships
+    return memberships
+
+
+def touch(user, kind):
+    key = VERSION_KEY.format(user.pk, kind)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+    user.__dict__.pop("_memberships", None)
@@ -0,0 +1,130 @@
+import os
+import time
+from contextvars import ContextVar
+
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from rest_framework import serializers
+
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+MEMORY_BUCKETS = (65536, 262144, 1048576, 4194304, 16777216, 67108864, 268435456)
+
+REQUESTS = Counter(
+    "foodgram_requests_total", "Количество запросов", ["route", "method", "status"]
+)
+REQUEST_DURATION = Histogram(
+    "foodgram_request_duration_seconds", "Время обработки запроса", ["route"]
+)
+DB_QUERIES = Histogram(
+    "foodgram_db_queries",
+    "Количество SQL-запросов на запрос",
+    ["route"],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+DB_DURATION = Histogram(
+    "foodgram_db_duration_seconds", "Время SQL-запросов на запрос", ["route"]
+)
+SERIALIZER_DURATION = Histogram(
+    "foodgram_serializer_duration_seconds",
+    "Время вычисления serializer.data на запрос",
+    ["route"],
+)
+RESPONSE_SIZE = Histogram(
+    "foodgram_response_size_bytes",
+    "Размер тела ответа",
+    ["route"],
+    buckets=SIZE_BUCKETS,
+)
+MEMORY_PEAK = Histogram(
+    "foodgram_memory_peak_bytes",
+    "Пик выделенной памяти на запрос (tracemalloc)",
+    ["route"],
+    buckets=MEMORY_BUCKETS,
+)
+MEMORY_NET = Histogram(
+    "foodgram_memory_net_bytes",
+    "Память, оставшаяся выделенной после запроса (tracemalloc)",
+    ["route"],
+    buckets=MEMORY_BUCKETS,
+)
+
+EVENT_STREAMS = Gauge(
+    "foodgram_event_streams",
+    "Открытые SSE-соединения",
+    multiprocess_mode="livesum",
+)
+
+current_stats = ContextVar("current_stats", default=None)
+
+
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.query_time += time.perf_counter() - started
+
+
+def route_name(request):
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match else "unresolved"
+
+
+def observe(request, response, duration, stats):
+    route = route_name(request)
+    REQUESTS.labels(route, request.method, response.status_code).inc()
+    REQUEST_DURATION.labels(route).observe(duration)
+    DB_QUERIES.labels(route).observe(stats.queries)
+    DB_DURATION.labels(route).observe(stats.query_time)
+    SERIALIZER_DURATION.labels(route).observe(stats.serializer_time)
+    if not response.streaming:
+        RESPONSE_SIZE.labels(route).observe(len(response.content))
+
+
+def _timed_data(data):
+    def timed(self):
+        stats = current_stats.get()
+        if stats is None:
+            return data.fget(self)
+        stats.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return data.fget(self)
+        finally:
+            stats.serializer_depth -= 1
+            if not stats.serializer_depth:
+                stats.serializer_time += time.perf_counter() - started
+
+    timed.instrumented = True
+    return property(timed)
+
+
+def instrument_serializers():
+    for serializer_class in (serializers.Serializer, serializers.ListSerializer):
+        data = serializer_class.__dict__["data"]
+        if not getattr(data.fget, "instrumented", False):
+            serializer_class.data = _timed_data(data)
+
+
+def render_metrics():
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
@@ -0,0 +1,339 @@
+import logging
+import random
+import re
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.db import connection
+from django.middleware.clickjacking import XFrameOptionsMiddleware
+from django.utils.cache import patch_vary_headers
+from rest_framework.exceptions import AuthenticationFailed
+
+from api import compression, db, metrics, profiling
+from api.authentication import CachedTokenAuthentication
+
+IN_LIST_RE = re.compile(r"IN \((?:%s, )*%s\)")
+LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+logger = logging.getLogger(__name__)
+
+# tracemalloc глобален: снимок ведёт не больше одного запроса процесса.
+tracing_lock = threading.Lock()
+
+
+class HybridMiddleware:
+    """База middleware, работающих и под WSGI, и под ASGI.
+
+    Под ASGI Django передаёт асинхронный get_response, и __call__
+    возвращает корутину acall. Синхронное middleware в асинхронной цепочке
+    заставило бы Django гонять каждый запрос через общий поток
+    sync_to_async, поэтому все middleware проекта наследуют этот класс.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.acall(request)
+        return self.call(request)
+
+
+class MetricsMiddleware(HybridMiddleware):
+    def call(self, request):
+        stats = metrics.RequestStats()
+        token = metrics.current_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            with db.execute_wrapper(stats.execute):
+                response = self.get_response(request)
+        finally:
+            metrics.current_stats.reset(token)
+        metrics.observe(request, response, time.perf_counter() - started, stats)
+        return response
+
+    async def acall(self, request):
+        stats = metrics.RequestStats()
+        token = metrics.current_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            with db.execute_wrapper(stats.execute):
+                response = await self.get_response(request)
+        finally:
+            metrics.current_stats.reset(token)
+        metrics.observe(request, response, time.perf_counter() - started, stats)
+        return response
+
+
+class SiteOnlyMixin:
+    """Пропускает запросы к API мимо middleware сайта.
+
+    API авторизуется только токеном, поэтому сессии, сообщения,
+    request.user из сессии и X-Frame-Options нужны лишь админке и
+    остальному сайту. Наследование от оригиналов сохраняет проверки
+    admin.E408-E410.
+    """
+
+    def __call__(self, request):
+        if request.path_info.startswith(settings.LEAN_API_PREFIX):
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class SiteSessionMiddleware(SiteOnlyMixin, SessionMiddleware):
+    pass
+
+
+class SiteAuthenticationMiddleware(SiteOnlyMixin, AuthenticationMiddleware):
+    pass
+
+
+class SiteMessageMiddleware(SiteOnlyMixin, MessageMiddleware):
+    pass
+
+
+class SiteXFrameOptionsMiddleware(SiteOnlyMixin, XFrameOptionsMiddleware):
+    pass
+
+
+class CompressionMiddleware(HybridMiddleware):
+    """Сжимает ответы API zstd, brotli или gzip по Accept-Encoding.
+
+    Ответы меньше COMPRESSION["MIN_SIZE"], потоковые и уже сжатые
+    пропускаются. HTML не сжимается: в нём CSRF-токен (BREACH).
+    """
+
+    def call(self, request):
+        return self.compress(request, self.get_response(request))
+
+    async def acall(self, request):
+        return self.compress(request, await self.get_response(request))
+
+    def compress(self, request, response):
+        config = settings.COMPRESSION
+        if (
+            not request.path.startswith(config["PATH_PREFIX"])
+            or response.streaming
+            or response.has_header("Content-Encoding")
+            or len(response.content) < config["MIN_SIZE"]
+            or not response.get("Content-Type", "").startswith(config["TYPES"])
+        ):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = compression.choose_encoding(request, config["LEVELS"])
+        if encoding is None:
+            return response
+
+        response.content = compression.compress_cached(response.content, encoding)
+        response["Content-Length"] = str(len(response.content))
+        response["Content-Encoding"] = encoding
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        return response
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryInspectorMiddleware(HybridMiddleware):
+    """Ищет N+1 и проверяет бюджет SQL-запросов для вьюх API.
+
+    Настройки берутся из QUERY_BUDGET. Во вьюхе можно задать атрибут
+    statement_timeout (в миллисекундах) для PostgreSQL. Под ASGI
+    соединение с БД общее для всех запросов процесса, и таймаут на время
+    запроса действует и на параллельные запросы.
+    """
+
+    def call(self, request):
+        if not request.path.startswith(settings.QUERY_BUDGET["PATH_PREFIX"]):
+            return self.get_response(request)
+
+        queries = []
+        try:
+            with db.execute_wrapper(self._recorder(queries)):
+                response = self.get_response(request)
+        finally:
+            if getattr(request, "_statement_timeout", None):
+                self._execute_raw("RESET statement_timeout")
+
+        self._inspect(request, queries)
+        return response
+
+    async def acall(self, request):
+        if not request.path.startswith(settings.QUERY_BUDGET["PATH_PREFIX"]):
+            return await self.get_response(request)
+
+        queries = []
+        try:
+            with db.execute_wrapper(self._recorder(queries)):
+                response = await self.get_response(request)
+        finally:
+            if getattr(request, "_statement_timeout", None):
+                await sync_to_async(self._execute_raw)("RESET statement_timeout")
+
+        self._inspect(request, queries)
+        return response
+
+    def _recorder(self, queries):
+        def record(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        return record
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timeout = getattr(getattr(view_func, "cls", None), "statement_timeout", None)
+        if timeout and connection.vendor == "postgresql":
+            self._execute_raw("SET statement_timeout = %s", [timeout])
+            request._statement_timeout = timeout
+
+    def _execute_raw(self, sql, params=None):
+        connection.ensure_connection()
+        with connection.connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+    def _inspect(self, request, queries):
+        config = settings.QUERY_BUDGET
+        route = metrics.route_name(request)
+        problems = []
+
+        budget = config["VIEWS"].get(
+            f"{request.method} {route}", config["VIEWS"].get(route, config["DEFAULT"])
+        )
+        if len(queries) > budget:
+            problems.append(
+                f"{route}: {len(queries)} SQL-запросов при бюджете {budget}"
+            )
+
+        repeats = Counter(fingerprint(sql) for sql in queries)
+        for sql, count in repeats.most_common():
+            if count < config["N_PLUS_ONE_THRESHOLD"]:
+                break
+            problems.append(f"{route}: N+1, запрос повторён {count} раз: {sql}")
+
+        if problems and config["RAISE"]:
+            raise QueryBudgetExceeded("\n".join(problems))
+        for problem in problems:
+            logger.warning(problem)
+
+
+def fingerprint(sql):
+    sql = IN_LIST_RE.sub("IN (...)", sql)
+    return LITERAL_RE.sub("?", sql)
+
+
+class ProfilingMiddleware(HybridMiddleware):
+    """Профилирует запрос сотрудника с заголовком X-Profile или ?profile=1.
+
+    Профиль сохраняется в PROFILING["DIR"], имя файла отдаётся в заголовке
+    X-Profile-Id. Сэмплер снимает стеки одного потока, а под ASGI запрос
+    проходит через цикл событий и потоки sync_to_async, поэтому там
+    профилирование не выполняется.
+    """
+
+    def call(self, request):
+        if not self._requested(request) or not self._is_staff(request):
+            return self.get_response(request)
+
+        with profiling.StackSampler(settings.PROFILING["INTERVAL"]) as sampler:
+            response = self.get_response(request)
+        response["X-Profile-Id"] = profiling.save_profile(
+            metrics.route_name(request), sampler.stacks
+        )
+        return response
+
+    async def acall(self, request):
+        return await self.get_response(request)
+
+    def _requested(self, request):
+        return "HTTP_X_PROFILE" in request.META or "profile" in request.GET
+
+    def _is_staff(self, request):
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            return user.is_staff
+        try:
+            result = CachedTokenAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return False
+        return result is not None and result[0].is_staff
+
+
+class MemoryTracingMiddleware(HybridMiddleware):
+    """Снимает пиковую и итоговую память запроса через tracemalloc.
+
+    Включается MEMORY_TRACING["ENABLED"] и отбирает долю запросов
+    SAMPLE_RATE. tracemalloc глобален для процесса, поэтому одновременно
+    снимок ведёт один запрос (tracing_lock), а в gthread воркерах и под
+    ASGI в него попадают и соседние запросы.
+    """
+
+    def call(self, request):
+        if not self._sampled() or not self._start():
+            return self.get_response(request)
+
+        try:
+            response = self.get_response(request)
+            net, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+        finally:
+            self._stop()
+        self._record(request, net, peak, snapshot)
+        return response
+
+    async def acall(self, request):
+        if not self._sampled() or not self._start():
+            return await self.get_response(request)
+
+        try:
+            response = await self.get_response(request)
+            net, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+        finally:
+            self._stop()
+        self._record(request, net, peak, snapshot)
+        return response
+
+    def _sampled(self):
+        config = settings.MEMORY_TRACING
+        return config["ENABLED"] and random.random() < config["SAMPLE_RATE"]
+
+    def _start(self):
+        # Запрос, пришедший во время чужого снимка, не отбирается.
+        if not tracing_lock.acquire(blocking=False):
+            return False
+        if tracemalloc.is_tracing():
+            # Трассировку включили снаружи (PYTHONTRACEMALLOC), её не трогаем.
+            tracing_lock.release()
+            return False
+        tracemalloc.start(settings.MEMORY_TRACING["FRAMES"])
+        return True
+
+    def _stop(self):
+        tracemalloc.stop()
+        tracing_lock.release()
+
+    def _record(self, request, net, peak, snapshot):
+        config = settings.MEMORY_TRACING
+        route = metrics.route_name(request)
+        metrics.MEMORY_PEAK.labels(route).observe(peak)
+        metrics.MEMORY_NET.labels(route).observe(net)
+        profiling.save_allocations(
+            route, peak, net, profiling.allocation_sites(snapshot, config["TOP"])
+        )
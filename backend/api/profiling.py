@@ -0,0 +1,134 @@
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from django.conf import settings
+
+PROFILE_SUFFIX = ".collapsed"
+ALLOCATIONS_SUFFIX = ".allocations"
+
+
+class StackSampler:
+    """Сэмплирующий профайлер одного потока.
+
+    Стеки собираются в формате collapsed stacks (flamegraph.pl, speedscope).
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = Counter()
+        self._thread_id = threading.get_ident()
+        self._stopped = threading.Event()
+        self._sampler = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._sampler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._sampler.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None and not self._stopped.is_set():
+                self.stacks[collapse(frame)] += 1
+
+
+def collapse(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def save_profile(route, stacks):
+    return _save(
+        route, PROFILE_SUFFIX, (f"{stack} {count}" for stack, count in stacks.items())
+    )
+
+
+def save_allocations(route, peak, net, sites):
+    lines = [f"peak {peak}", f"net {net}"]
+    lines += (f"site {size} {site}" for site, size in sites)
+    return _save(route, ALLOCATIONS_SUFFIX, lines)
+
+
+def _save(route, suffix, lines):
+    directory = settings.PROFILING["DIR"]
+    os.makedirs(directory, exist_ok=True)
+    name = f"{time.time_ns()}_{route}{suffix}"
+    with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+        for line in lines:
+            f.write(f"{line}\n")
+
+    files = list_profiles(suffix)
+    for old in files[: max(len(files) - settings.PROFILING["MAX_FILES"], 0)]:
+        os.remove(os.path.join(directory, old))
+    return name
+
+
+def list_profiles(suffix=PROFILE_SUFFIX):
+    directory = settings.PROFILING["DIR"]
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name for name in os.listdir(directory) if name.endswith(suffix))
+
+
+def profile_route(name):
+    return os.path.splitext(name)[0].split("_", 1)[1]
+
+
+def load_profile(name):
+    stacks = Counter()
+    path = os.path.join(settings.PROFILING["DIR"], name)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            stacks[stack] += int(count)
+    return stacks
+
+
+def load_allocations(name):
+    """Возвращает (peak, net, sites) сохранённого снимка tracemalloc."""
+    values = {}
+    sites = Counter()
+    path = os.path.join(settings.PROFILING["DIR"], name)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            kind, _, rest = line.rstrip("\n").partition(" ")
+            if kind == "site":
+                size, _, site = rest.partition(" ")
+                sites[site] += int(size)
+            else:
+                values[kind] = int(rest)
+    return values["peak"], values["net"], sites
+
+
+def allocation_sites(snapshot, limit):
+    """Группирует память снимка по ближайшему кадру из кода проекта."""
+    snapshot = snapshot.filter_traces(
+        [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ]
+    )
+    sites = Counter()
+    for stat in snapshot.statistics("traceback"):
+        frame = next(
+            (
+                frame
+                for frame in reversed(stat.traceback)
+                if frame.filename.startswith(str(settings.BASE_DIR))
+            ),
+            stat.traceback[-1],
+        )
+        sites[f"{frame.filename}:{frame.lineno}"] += stat.size
+    return sites.most_common(limit)
@@ -0,0 +1,186 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.utils.encoding import filepath_to_uri
+
+from api.fieldsets import wants
+from api.memberships import FAVORITES, FOLLOWING, SHOPPING_CART, get_memberships
+from recipes.models import Recipe, RecipeIngredient
+
+User = get_user_model()
+
+RECIPE_CACHE_KEY = "recipe:{}:{}"
+AUTHOR_CACHE_KEY = "recipe-author:{}"
+
+RECIPE_FIELDS = ("id", "name", "image", "text", "cooking_time")
+AUTHOR_FIELDS = ("id", "username", "first_name", "last_name", "email", "avatar")
+RECIPE_OUTPUT_FIELDS = (
+    "id",
+    "author",
+    "ingredients",
+    "name",
+    "image",
+    "text",
+    "cooking_time",
+    "is_favorited",
+    "is_in_shopping_cart",
+)
+INGREDIENT_FIELDS = (
+    "recipe_id",
+    "ingredient_id",
+    "ingredient__name",
+    "ingredient__measurement_unit",
+    "amount",
+)
+
+
+def recipe_rows():
+    """Версии рецептов для RecipeReadModel в виде словарей .values().
+
+    Всё остальное берётся из кешированных фрагментов и множеств
+    api.memberships.
+    """
+    return Recipe.objects.values("id", "updated", "author_id")
+
+
+def recipe_fragments(rows, ingredients=True):
+    """Общие для всех пользователей части рецептов по их версиям.
+
+    Промахи кеша добираются одним запросом рецептов и одним запросом
+    ингредиентов. Без ingredients промахи загружаются без ингредиентов
+    и в кеш не попадают.
+    """
+    keys = {
+        row["id"]: RECIPE_CACHE_KEY.format(row["id"], row["updated"].timestamp())
+        for row in rows
+    }
+    cached = cache.get_many(keys.values())
+    fragments = {pk: cached[key] for pk, key in keys.items() if key in cached}
+
+    missing = [pk for pk in keys if pk not in fragments]
+    if missing and not ingredients:
+        fragments.update(
+            (recipe["id"], recipe)
+            for recipe in Recipe.objects.filter(pk__in=missing).values(*RECIPE_FIELDS)
+        )
+    elif missing:
+        ingredients = defaultdict(list)
+        for item in (
+            RecipeIngredient.objects.filter(recipe_id__in=missing)
+            .order_by("pk")
+            .values_list(*INGREDIENT_FIELDS)
+        ):
+            recipe_id, ingredient_id, name, measurement_unit, amount = item
+            ingredients[recipe_id].append(
+                {
+                    "id": ingredient_id,
+                    "name": name,
+                    "measurement_unit": measurement_unit,
+                    "amount": amount,
+                }
+            )
+        loaded = {
+            recipe["id"]: dict(recipe, ingredients=ingredients[recipe["id"]])
+            for recipe in Recipe.objects.filter(pk__in=missing).values(*RECIPE_FIELDS)
+        }
+        cache.set_many(
+            {keys[pk]: fragment for pk, fragment in loaded.items()},
+            settings.RECIPE_CACHE_TIMEOUT,
+        )
+        fragments.update(loaded)
+    return fragments
+
+
+def author_fragments(author_ids):
+    keys = {pk: AUTHOR_CACHE_KEY.format(pk) for pk in author_ids}
+    cached = cache.get_many(keys.values())
+    fragments = {pk: cached[key] for pk, key in keys.items() if key in cached}
+
+    missing = [pk for pk in keys if pk not in fragments]
+    if missing:
+        loaded = {
+            author["id"]: author
+            for author in User.objects.filter(pk__in=missing).values(*AUTHOR_FIELDS)
+        }
+        cache.set_many(
+            {keys[pk]: fragment for pk, fragment in loaded.items()},
+            settings.RECIPE_CACHE_TIMEOUT,
+        )
+        fragments.update(loaded)
+    return fragments
+
+
+def forget_author(author_id):
+    cache.delete(AUTHOR_CACHE_KEY.format(author_id))
+
+
+class RecipeReadModel:
+    """Собирает ответ RecipeSerializer из фрагментов и флагов пользователя.
+
+    Результат совпадает с RecipeSerializer побайтно после рендеринга.
+    С набором fields загружается только то, что нужно этим полям.
+    """
+
+    def __init__(self, request, fields=None):
+        self.fields = fields
+        self.memberships = (
+            get_memberships(request.user)
+            if request.user.is_authenticated
+            and wants(fields, "author", "is_favorited", "is_in_shopping_cart")
+            else None
+        )
+        self.media_prefix = request.build_absolute_uri(default_storage.base_url)
+
+    def media_url(self, name):
+        if not name:
+            return None
+        return self.media_prefix + filepath_to_uri(name)
+
+    def build(self, rows):
+        rows = list(rows)
+        if wants(self.fields, *RECIPE_FIELDS[1:], "ingredients"):
+            recipes = recipe_fragments(rows, wants(self.fields, "ingredients"))
+        else:
+            recipes = {row["id"]: {"id": row["id"]} for row in rows}
+        authors = (
+            author_fragments({row["author_id"] for row in rows})
+            if wants(self.fields, "author")
+            else {}
+        )
+        return [
+            self.build_recipe(row, recipes[row["id"]], authors.get(row["author_id"]))
+            for row in rows
+            if row["id"] in recipes
+        ]
+
+    def build_recipe(self, row, recipe, author):
+        data = {"id": recipe["id"]}
+        if author is not None:
+            data["author"] = {
+                "id": author["id"],
+                "username": author["username"],
+                "first_name": author["first_name"],
+                "last_name": author["last_name"],
+                "email": author["email"],
+                "avatar": self.media_url(author["avatar"]),
+                "is_subscribed": self.memberships is not None
+                and author["id"] in self.memberships[FOLLOWING],
+            }
+        if "ingredients" in recipe:
+            data["ingredients"] = recipe["ingredients"]
+        if "name" in recipe:
+            data["name"] = recipe["name"]
+            data["image"] = self.media_url(recipe["image"])
+            data["text"] = recipe["text"]
+            data["cooking_time"] = recipe["cooking_time"]
+        if self.memberships is not None:
+            data["is_favorited"] = recipe["id"] in self.memberships[FAVORITES]
+            data["is_in_shopping_cart"] = (
+                recipe["id"] in self.memberships[SHOPPING_CART]
+            )
+        if self.fields is None:
+            return data
+        return {name: value for name, value in data.items() if name in self.fields}
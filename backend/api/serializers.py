@@ -4,41 +4,17 @@ import uuid
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import prefetch_related_objects
 from djoser.serializers import UserSerializer as DjoserUserSerializer
 from rest_framework import serializers
-from rest_framework.validators import UniqueTogetherValidator
 
-from recipes.models import Favorite, Ingredient, Recipe, RecipeIngredient, ShoppingCart
-from users.models import Subscription
+from api.fieldsets import SparseFieldsetMixin
+from recipes.models import Ingredient, Recipe, RecipeIngredient
 
 User = get_user_model()
 
 
-class SubscriptionCreateSerializer(serializers.ModelSerializer):
-    user = serializers.PrimaryKeyRelatedField(read_only=True)
-    author = serializers.PrimaryKeyRelatedField(queryset=User.objects.all())
-
-    class Meta:
-        model = Subscription
-        fields = ("user", "author")
-
-    def validate(self, attrs):
-        author = attrs["author"]
-        user = self.context["request"].user
-
-        if author == user:
-            raise serializers.ValidationError("Нельзя подписаться на самого себя.")
-
-        if Subscription.objects.filter(user=user, author=author).exists():
-            raise serializers.ValidationError("Вы уже подписаны на этого пользователя.")
-
-        attrs["user"] = user
-        return attrs
-
-    def create(self, validated_data):
-        return Subscription.objects.create(**validated_data)
-
-
 class UserCreateSerializer(serializers.ModelSerializer):
     password = serializers.CharField(
         write_only=True,
@@ -63,7 +39,7 @@ class UserCreateSerializer(serializers.ModelSerializer):
         return user
 
 
-class CustomUserSerializer(DjoserUserSerializer):
+class CustomUserSerializer(SparseFieldsetMixin, DjoserUserSerializer):
     is_subscribed = serializers.SerializerMethodField()
     avatar = serializers.SerializerMethodField()
 
@@ -81,6 +57,8 @@ class CustomUserSerializer(DjoserUserSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, "is_subscribed"):
+            return obj.is_subscribed
         request = self.context.get("request")
         if request and request.user.is_authenticated:
             return obj.following.filter(user=request.user).exists()
@@ -121,6 +99,8 @@ class AuthorSerializer(serializers.ModelSerializer):
         return None
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, "is_subscribed"):
+            return obj.is_subscribed
         request = self.context.get("request")
         if request and request.user.is_authenticated:
             return obj.following.filter(user=request.user).exists()
@@ -142,11 +122,14 @@ class SubscriptionUserSerializer(CustomUserSerializer):
 
     def get_recipes(self, obj):
         request = self.context.get("request")
-        recipes_limit = request.query_params.get("recipes_limit")
-        recipes = obj.recipes.all()
+        if hasattr(obj, "recipes_preview"):
+            recipes = [Recipe(**data) for data in obj.recipes_preview]
+        else:
+            recipes_limit = request.query_params.get("recipes_limit")
+            recipes = obj.recipes.all()
 
-        if recipes_limit and recipes_limit.isdigit():
-            recipes = recipes[: int(recipes_limit)]
+            if recipes_limit and recipes_limit.isdigit():
+                recipes = recipes[: int(recipes_limit)]
 
         return SimpleRecipeSerializer(
             recipes, many=True, context={"request": request}
@@ -200,6 +183,14 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
         fields = ("id", "name", "measurement_unit", "amount")
 
 
+class RecipeIngredientWriteSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField()
+
+    class Meta:
+        model = RecipeIngredient
+        fields = ("id", "amount")
+
+
 class RecipeSerializer(serializers.ModelSerializer):
     author = AuthorSerializer(read_only=True)
     ingredients = RecipeIngredientSerializer(
@@ -238,7 +229,9 @@ class RecipeSerializer(serializers.ModelSerializer):
 
 
 class RecipeCreateSerializer(serializers.ModelSerializer):
-    ingredients = RecipeIngredientSerializer(source="recipe_ingredients", many=True)
+    ingredients = RecipeIngredientWriteSerializer(
+        source="recipe_ingredients", many=True
+    )
     image = Base64ImageField(required=True)
 
     class Meta:
@@ -249,7 +242,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         if not value:
             raise serializers.ValidationError("Добавьте хотя бы один ингредиент")
 
-        ingredient_ids = [item["ingredient"].id for item in value]
+        ingredient_ids = [item["id"] for item in value]
         if len(ingredient_ids) != len(set(ingredient_ids)):
             raise serializers.ValidationError("Ингредиенты не должны повторяться")
 
@@ -259,7 +252,17 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
                     f"Количество для ингредиента должно быть больше 0"
                 )
 
-        return value
+        ingredients = Ingredient.objects.in_bulk(ingredient_ids)
+        missing_ids = [pk for pk in ingredient_ids if pk not in ingredients]
+        if missing_ids:
+            raise serializers.ValidationError(
+                "Ингредиенты не найдены: " + ", ".join(str(pk) for pk in missing_ids)
+            )
+
+        return [
+            {"ingredient": ingredients[item["id"]], "amount": item["amount"]}
+            for item in value
+        ]
 
     def validate_cooking_time(self, value):
         if value <= 0:
@@ -288,6 +291,9 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             ]
         )
 
+    # Рецепт и его ингредиенты фиксируются вместе: иначе фрагмент
+    # recipe:{id}:{updated} успел бы закешироваться без ингредиентов.
+    @transaction.atomic
     def create(self, validated_data):
         if "recipe_ingredients" not in validated_data:
             raise serializers.ValidationError("Не указаны ингредиенты")
@@ -297,6 +303,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         self._save_ingredients(recipe, ingredients_data)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         if "recipe_ingredients" in validated_data:
             instance.recipe_ingredients.all().delete()
@@ -306,6 +313,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
+        prefetch_related_objects([instance], "recipe_ingredients__ingredient")
         return RecipeSerializer(instance, context=self.context).data
 
 
@@ -313,45 +321,3 @@ class ShortRecipeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
         fields = ("id", "name", "image", "cooking_time")
-
-
-class FavoriteSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Favorite
-        fields = ("user", "recipe")
-        validators = [
-            UniqueTogetherValidator(
-                queryset=Favorite.objects.all(),
-                fields=("user", "recipe"),
-                message="Рецепт уже в избранном",
-            )
-        ]
-
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.fields["user"].required = False
-        self.fields["recipe"].required = False
-
-    def to_representation(self, instance):
-        return RecipeSerializer(instance.recipe, context=self.context).data
-
-
-class ShoppingCartSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = ShoppingCart
-        fields = ("user", "recipe")
-        validators = [
-            UniqueTogetherValidator(
-                queryset=ShoppingCart.objects.all(),
-                fields=("user", "recipe"),
-                message="Рецепт уже в списке покупок",
-            )
-        ]
-
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.fields["user"].required = False
-        self.fields["recipe"].required = False
-
-    def to_representation(self, instance):
-        return RecipeSerializer(instance.recipe, context=self.context).data
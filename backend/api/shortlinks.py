@@ -0,0 +1,81 @@
+import re
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import (
+    Http404,
+    HttpResponseNotAllowed,
+    HttpResponsePermanentRedirect,
+)
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_safe
+
+from api.cache import LRUCache
+from recipes.constants import SHORT_CODE_ALPHABET, SHORT_CODE_LENGTH
+from recipes.models import Recipe
+
+SHORT_LINK_CACHE_KEY = "short-link:{}"
+SHORT_CODE_RE = re.compile(
+    "[%s]{%d}" % (re.escape(SHORT_CODE_ALPHABET), SHORT_CODE_LENGTH)
+)
+
+local_links = LRUCache(
+    settings.SHORT_LINK_LOCAL_SIZE, settings.SHORT_LINK_LOCAL_TIMEOUT
+)
+
+
+def short_link_target(code):
+    """Путь рецепта для кода: локальный LRU, общий кеш, затем БД.
+
+    Код не того вида сразу даёт None: сегмент пути из URL не должен
+    становиться ключом memcached (длина, пробелы).
+    """
+    if not SHORT_CODE_RE.fullmatch(code):
+        return None
+    target = local_links.get(code)
+    if target is None:
+        target = cache.get(SHORT_LINK_CACHE_KEY.format(code))
+        if target is None:
+            recipe_id = (
+                Recipe.objects.filter(short_code=code)
+                .values_list("id", flat=True)
+                .first()
+            )
+            if recipe_id is None:
+                return None
+            target = f"/recipes/{recipe_id}/"
+            cache.set(
+                SHORT_LINK_CACHE_KEY.format(code),
+                target,
+                settings.SHORT_LINK_CACHE_TIMEOUT,
+            )
+        local_links.set(code, target)
+    return target
+
+
+def redirect_to(target):
+    if target is None:
+        raise Http404
+    response = HttpResponsePermanentRedirect(target)
+    patch_cache_control(response, public=True, max_age=settings.SHORT_LINK_MAX_AGE)
+    return response
+
+
+@require_safe
+def short_link_redirect(request, code):
+    return redirect_to(short_link_target(code))
+
+
+async def short_link_redirect_async(request, code):
+    """short_link_redirect для ASGI.
+
+    Попадание в локальный LRU обслуживается прямо в цикле событий, в
+    общий кеш и БД запрос уходит через sync_to_async.
+    """
+    if request.method not in ("GET", "HEAD"):
+        return HttpResponseNotAllowed(["GET", "HEAD"])
+    target = local_links.get(code)
+    if target is None:
+        target = await sync_to_async(short_link_target)(code)
+    return redirect_to(target)
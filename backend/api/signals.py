@@ -0,0 +1,45 @@
+from django.contrib.auth import get_user_model
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from api import db
+from api.authentication import forget_token
+from api.readmodels import forget_author
+from recipes.models import Ingredient, Recipe
+
+User = get_user_model()
+
+
+@receiver(connection_created)
+def install_execute_wrapper(sender, connection, **kwargs):
+    db.install(connection)
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    forget_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+def forget_user_tokens(sender, instance, created, **kwargs):
+    if created:
+        return
+    for key in Token.objects.filter(user=instance).values_list("key", flat=True):
+        forget_token(key)
+
+
+@receiver(post_save, sender=User)
+def forget_author_fragment(sender, instance, created, **kwargs):
+    if not created:
+        forget_author(instance.pk)
+
+
+@receiver(post_save, sender=Ingredient)
+def touch_ingredient_recipes(sender, instance, created, **kwargs):
+    if not created:
+        Recipe.objects.filter(recipe_ingredients__ingredient=instance).update(
+            updated=timezone.now()
+        )
@@ -0,0 +1,74 @@
+import hashlib
+import os
+import threading
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_safe
+
+from api.compression import choose_encoding, compress
+
+LEVELS = {"zstd": 19, "br": 11, "gzip": 9}
+
+
+class SpaShell:
+    """index.html фронтенда в памяти вместе с вариантами, сжатыми один раз.
+
+    Файл перечитывается, только когда меняются его mtime или размер.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.signature = None
+        self.variants = {}
+
+    def get(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            raise Http404
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature != self.signature:
+            with self.lock:
+                if signature != self.signature:
+                    self.load(signature)
+        return self.variants
+
+    def load(self, signature):
+        with open(self.path, "rb") as file:
+            content = file.read()
+        digest = hashlib.sha1(content).hexdigest()[:16]
+        variants = {None: (content, f'"{digest}"')}
+        for encoding, level in LEVELS.items():
+            variants[encoding] = (
+                compress(content, encoding, level),
+                f'"{digest}-{encoding}"',
+            )
+        self.variants = variants
+        self.signature = signature
+
+
+shell = SpaShell(os.path.join(settings.FRONTEND_DIR, "index.html"))
+
+
+@require_safe
+def spa_shell(request):
+    """Отдаёт SPA-оболочку для всех путей, которые не обработал бэкенд."""
+    variants = shell.get()
+    encoding = choose_encoding(request, LEVELS)
+    content, etag = variants[encoding]
+
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+    if if_none_match and etag in parse_etags(if_none_match):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(content, content_type="text/html; charset=utf-8")
+        if encoding:
+            response["Content-Encoding"] = encoding
+    response["ETag"] = etag
+    response["Cache-Control"] = "no-cache"
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
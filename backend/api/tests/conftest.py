@@ -0,0 +1,46 @@
+import pytest
+from django.core.cache import cache
+from model_bakery import baker
+from rest_framework.test import APIClient
+
+from api.authentication import local_tokens
+from recipes.models import Favorite, Ingredient, Recipe, RecipeIngredient
+from users.models import Subscription, User
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    cache.clear()
+    local_tokens.clear()
+    yield
+    cache.clear()
+    local_tokens.clear()
+
+
+@pytest.fixture
+def user(db):
+    return baker.make(User, email="reader@example.com", username="reader")
+
+
+@pytest.fixture
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def authors(user):
+    ingredients = baker.make(Ingredient, _quantity=3)
+    authors = baker.make(User, _quantity=3)
+    for author in authors:
+        Subscription.objects.create(user=user, author=author)
+        for recipe in baker.make(
+            Recipe, author=author, image="recipes/x.png", _quantity=2
+        ):
+            for ingredient in ingredients:
+                RecipeIngredient.objects.create(
+                    recipe=recipe, ingredient=ingredient, amount=10
+                )
+            Favorite.objects.create(user=user, recipe=recipe)
+    return authors
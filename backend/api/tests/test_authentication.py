@@ -0,0 +1,38 @@
+import warnings
+
+import pytest
+from django.core.cache.backends.base import CacheKeyWarning
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+def test_valid_token_is_accepted(client, user):
+    token = Token.objects.create(user=user)
+    client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    response = client.get("/api/users/me/")
+
+    assert response.status_code == 200
+    assert response.json()["id"] == user.pk
+
+
+@pytest.mark.parametrize("key", ["a" * 260, "A" * 40, "g" * 40, "a" * 39, "a\x01" * 20])
+def test_malformed_token_is_rejected_before_cache(
+    client, user, key, django_assert_num_queries
+):
+    client.credentials(HTTP_AUTHORIZATION=f"Token {key}")
+
+    # LocMemCache лишь предупреждает о ключах, которые отверг бы memcached.
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", CacheKeyWarning)
+        with django_assert_num_queries(0):
+            response = client.get("/api/users/me/")
+
+    assert response.status_code == 401
@@ -0,0 +1,50 @@
+import pytest
+from django.core.cache import cache
+
+pytestmark = pytest.mark.django_db
+
+
+def get(client, url, num_queries, django_assert_num_queries):
+    cache.clear()
+    with django_assert_num_queries(num_queries):
+        response = client.get(url)
+    assert response.status_code == 200
+    return response.json()["results"]
+
+
+def test_recipe_fields_skip_queries(api_client, authors, django_assert_num_queries):
+    full = get(api_client, "/api/recipes/", 8, django_assert_num_queries)
+    sparse = get(
+        api_client,
+        "/api/recipes/?fields=id,name,image",
+        3,
+        django_assert_num_queries,
+    )
+
+    assert len(sparse) == len(full) == 6
+    assert all(set(recipe) == {"id", "name", "image"} for recipe in sparse)
+    assert [recipe["id"] for recipe in sparse] == [recipe["id"] for recipe in full]
+
+
+def test_subscription_fields_skip_queries(
+    api_client, authors, django_assert_num_queries
+):
+    full = get(api_client, "/api/users/subscriptions/", 3, django_assert_num_queries)
+    sparse = get(
+        api_client,
+        "/api/users/subscriptions/?fields=id,email",
+        2,
+        django_assert_num_queries,
+    )
+
+    assert "recipes" in full[0] and "recipes_count" in full[0]
+    assert all(set(user) == {"id", "email"} for user in sparse)
+    assert {user["id"] for user in sparse} == {author.pk for author in authors}
+
+
+@pytest.mark.parametrize("url", ["/api/recipes/", "/api/users/subscriptions/"])
+def test_unknown_field_is_rejected(api_client, authors, url):
+    response = api_client.get(f"{url}?fields=id,unknown")
+
+    assert response.status_code == 400
+    assert "unknown" in response.json()["fields"]
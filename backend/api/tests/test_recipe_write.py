@@ -0,0 +1,49 @@
+import pytest
+from model_bakery import baker
+
+from api.serializers import RecipeCreateSerializer
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def failing_bulk_create(objs, *args, **kwargs):
+    raise RuntimeError("ingredients failed")
+
+
+def test_create_rolls_back_recipe_without_ingredients(user, monkeypatch):
+    ingredient = baker.make(Ingredient)
+    monkeypatch.setattr(RecipeIngredient.objects, "bulk_create", failing_bulk_create)
+
+    with pytest.raises(RuntimeError):
+        RecipeCreateSerializer().create(
+            {
+                "author": user,
+                "name": "Суп",
+                "text": "Варить",
+                "cooking_time": 10,
+                "image": "recipes/x.png",
+                "recipe_ingredients": [{"ingredient": ingredient, "amount": 5}],
+            }
+        )
+
+    assert not Recipe.objects.exists()
+
+
+def test_update_keeps_old_ingredients_on_failure(user, monkeypatch):
+    recipe = baker.make(Recipe, author=user, image="recipes/x.png", name="Суп")
+    old = baker.make(RecipeIngredient, recipe=recipe, amount=1)
+    monkeypatch.setattr(RecipeIngredient.objects, "bulk_create", failing_bulk_create)
+
+    with pytest.raises(RuntimeError):
+        RecipeCreateSerializer().update(
+            recipe,
+            {
+                "name": "Борщ",
+                "recipe_ingredients": [{"ingredient": old.ingredient, "amount": 5}],
+            },
+        )
+
+    recipe.refresh_from_db()
+    assert recipe.name == "Суп"
+    assert list(recipe.recipe_ingredients.values_list("pk", flat=True)) == [old.pk]
@@ -0,0 +1,29 @@
+import warnings
+
+import pytest
+from django.core.cache.backends.base import CacheKeyWarning
+from model_bakery import baker
+
+from recipes.models import Recipe
+
+pytestmark = pytest.mark.django_db
+
+
+def test_short_link_redirects(client, user):
+    recipe = baker.make(Recipe, author=user, image="recipes/x.png")
+
+    response = client.get(f"/s/{recipe.short_code}")
+
+    assert response.status_code == 301
+    assert response["Location"] == f"/recipes/{recipe.pk}/"
+
+
+@pytest.mark.parametrize("code", ["a" * 260, "a%20b", "abc-def", "abcdef", "a" * 8])
+def test_malformed_code_is_not_found(client, code, django_assert_num_queries):
+    # LocMemCache лишь предупреждает о ключах, которые отверг бы memcached.
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", CacheKeyWarning)
+        with django_assert_num_queries(0):
+            response = client.get(f"/s/{code}")
+
+    assert response.status_code == 404
@@ -0,0 +1,49 @@
+from rest_framework.throttling import ScopedRateThrottle
+
+
+class TokenBucketThrottle(ScopedRateThrottle):
+    """Token bucket (GCRA) в общем кеше Django, одинаковый для всех воркеров.
+
+    Scope берётся из throttle_scopes_by_action вьюхи, ёмкость и скорость
+    пополнения ведра из DEFAULT_THROTTLE_RATES: "10/min" значит до 10
+    запросов подряд и один новый каждые 6 секунд. Ключ строится по
+    пользователю, для анонимов по IP.
+
+    В кеше хранится теоретическое время прихода (TAT) в миллисекундах,
+    которое сдвигается атомарным incr, поэтому read-modify-write не нужен.
+    """
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, "throttle_scopes_by_action", {}).get(
+            getattr(view, "action", None)
+        )
+        if not self.scope:
+            return True
+
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        self.key = self.get_cache_key(request, view)
+
+        now = int(self.timer() * 1000)
+        interval = self.duration * 1000 // self.num_requests
+        if self.cache.add(self.key, now + interval, self.duration):
+            return True
+        try:
+            tat = self.cache.incr(self.key, interval)
+        except ValueError:
+            self.cache.set(self.key, now + interval, self.duration)
+            return True
+
+        if tat < now + interval:
+            # Ведро простаивало и полно: TAT отстал от текущего времени.
+            self.cache.set(self.key, now + interval, self.duration)
+            return True
+        if tat > now + self.num_requests * interval:
+            self.cache.decr(self.key, interval)
+            self.wait_seconds = (tat - self.num_requests * interval - now) / 1000
+            return False
+        self.cache.touch(self.key, self.duration)
+        return True
+
+    def wait(self):
+        return self.wait_seconds
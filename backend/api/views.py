@@ -1,12 +1,25 @@
 from io import BytesIO
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Count, Exists, OuterRef, Sum
+from django.db.models import (
+    BooleanField,
+    Count,
+    Exists,
+    OuterRef,
+    Prefetch,
+    Sum,
+    Value,
+)
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.functional import cached_property
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet as DjoserUserViewSet
+from prometheus_client import CONTENT_TYPE_LATEST
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.filters import SearchFilter
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import (
@@ -17,23 +30,40 @@ from rest_framework.permissions import (
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from api import events, memberships
+from api.fieldsets import requested_fields, wants
 from api.filters import IngredientSearchFilter, RecipeFilter
+from api.metrics import render_metrics
+from api.readmodels import RECIPE_OUTPUT_FIELDS, RecipeReadModel, recipe_rows
 from api.serializers import (
-    FavoriteSerializer,
     IngredientSerializer,
     RecipeCreateSerializer,
     RecipeSerializer,
-    ShoppingCartSerializer,
-    SubscriptionCreateSerializer,
+    ShortRecipeSerializer,
     SubscriptionUserSerializer,
     UserAvatarSerializer,
 )
-from recipes.models import Favorite, Ingredient, Recipe, RecipeIngredient, ShoppingCart
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    make_short_code,
+)
 from users.models import Subscription
 
 User = get_user_model()
 
 
+def with_is_subscribed(queryset, user):
+    return queryset.annotate(
+        is_subscribed=Exists(
+            Subscription.objects.filter(user=user, author=OuterRef("pk"))
+        )
+    )
+
+
 class SubscriptionPagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = "page_size"
@@ -43,6 +73,7 @@ class SubscriptionPagination(PageNumberPagination):
 class UserViewSet(DjoserUserViewSet):
     queryset = User.objects.all()
     pagination_class = SubscriptionPagination
+    throttle_scopes_by_action = {"subscriptions": "subscriptions"}
 
     permission_classes_by_action = {
         "create": [AllowAny],
@@ -64,6 +95,29 @@ class UserViewSet(DjoserUserViewSet):
             return UserCreateSerializer
         return super().get_serializer_class()
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.user.is_authenticated and wants(self.fieldset, "is_subscribed"):
+            queryset = with_is_subscribed(queryset, self.request.user)
+        return queryset
+
+    @cached_property
+    def fieldset(self):
+        if getattr(self, "swagger_fake_view", False):
+            return None
+        if self.action == "subscriptions":
+            serializer_class = SubscriptionUserSerializer
+        elif self.action in ("list", "retrieve", "me"):
+            serializer_class = self.get_serializer_class()
+        else:
+            return None
+        return requested_fields(self.request, serializer_class.Meta.fields)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["fields"] = self.fieldset
+        return context
+
     def get_permissions(self):
         if self.action in self.permission_classes_by_action:
             return [perm() for perm in self.permission_classes_by_action[self.action]]
@@ -99,14 +153,35 @@ class UserViewSet(DjoserUserViewSet):
         detail=True, methods=["post", "delete"], permission_classes=[IsAuthenticated]
     )
     def subscribe(self, request, pk=None, **kwargs):
-        author = get_object_or_404(User, pk=pk)
-
         if request.method == "POST":
-            serializer = SubscriptionCreateSerializer(
-                data={"author": author.id}, context={"request": request}
+            if pk == request.user.id:
+                return Response(
+                    {"error": "Нельзя подписаться на самого себя."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            recipes_limit = request.query_params.get("recipes_limit")
+            author = Subscription.objects.add(
+                request.user,
+                pk,
+                (
+                    int(recipes_limit)
+                    if recipes_limit and recipes_limit.isdigit()
+                    else None
+                ),
+            )
+            if author is None:
+                raise Http404
+            if not author.added:
+                return Response(
+                    {"error": "Вы уже подписаны на этого пользователя."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            memberships.touch(request.user, memberships.FOLLOWING)
+            events.publish(
+                events.user_topic(request.user.pk),
+                {"type": memberships.FOLLOWING, "author": pk, "active": True},
             )
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
 
             author_serializer = SubscriptionUserSerializer(
                 author, context={"request": request}
@@ -116,26 +191,43 @@ class UserViewSet(DjoserUserViewSet):
 
         if request.method == "DELETE":
             deleted_count, _ = Subscription.objects.filter(
-                user=request.user, author=author
+                user=request.user, author_id=pk
             ).delete()
             if deleted_count == 0:
+                get_object_or_404(User, pk=pk)
                 return Response(
                     {"error": "Вы не подписаны на этого пользователя"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
+            memberships.touch(request.user, memberships.FOLLOWING)
+            events.publish(
+                events.user_topic(request.user.pk),
+                {"type": memberships.FOLLOWING, "author": pk, "active": False},
+            )
             return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=False, methods=["get"], permission_classes=[IsAuthenticated])
     def subscriptions(self, request):
         queryset = User.objects.filter(following__user=request.user).annotate(
-            recipes_count=Count("recipes")
+            is_subscribed=Value(True, output_field=BooleanField())
         )
+        if wants(self.fieldset, "recipes_count"):
+            queryset = queryset.annotate(recipes_count=Count("recipes"))
+        if wants(self.fieldset, "recipes"):
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    "recipes",
+                    queryset=Recipe.objects.only(
+                        "id", "author_id", "name", "image", "cooking_time"
+                    ),
+                )
+            )
 
         page = self.paginate_queryset(queryset)
         serializer = SubscriptionUserSerializer(
             page if page is not None else queryset,
             many=True,
-            context={"request": request},
+            context={"request": request, "fields": self.fieldset},
         )
         return (
             self.get_paginated_response(serializer.data)
@@ -171,6 +263,11 @@ class RecipeViewSet(viewsets.ModelViewSet):
     filterset_class = RecipeFilter
     permission_classes = [IsAuthenticatedOrReadOnly]
     pagination_class = PageNumberPagination
+    lookup_value_regex = r"\d+"
+    throttle_scopes_by_action = {
+        "create": "recipe_create",
+        "download_shopping_cart": "download_shopping_cart",
+    }
 
     def get_serializer_class(self):
         if self.action in ["create", "update", "partial_update"]:
@@ -178,13 +275,15 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return RecipeSerializer
 
     def get_queryset(self):
-        queryset = Recipe.objects.select_related("author").prefetch_related(
-            "recipe_ingredients__ingredient"
-        )
+        queryset = Recipe.objects.prefetch_related("recipe_ingredients__ingredient")
 
         user = self.request.user
-        if user.is_authenticated:
-            queryset = queryset.annotate(
+        if not user.is_authenticated:
+            queryset = queryset.select_related("author")
+        else:
+            queryset = queryset.prefetch_related(
+                Prefetch("author", queryset=with_is_subscribed(User.objects, user))
+            ).annotate(
                 is_favorited=Exists(
                     Favorite.objects.filter(user=user, recipe=OuterRef("pk"))
                 ),
@@ -195,38 +294,99 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        if "ids" in request.query_params:
+            return self.multi_get(request)
+        queryset = self.filter_queryset(recipe_rows())
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(self.get_read_model().build(page))
+
+    def get_read_model(self):
+        return RecipeReadModel(
+            self.request, requested_fields(self.request, RECIPE_OUTPUT_FIELDS)
+        )
+
+    def multi_get(self, request):
+        """?ids=1,2,3: рецепты без пагинации в порядке запроса.
+
+        Число запросов не зависит от количества id, несуществующие id
+        пропускаются.
+        """
+        try:
+            ids = list(
+                dict.fromkeys(
+                    int(pk) for pk in request.query_params["ids"].split(",") if pk
+                )
+            )
+        except ValueError:
+            raise ValidationError({"ids": "Ожидается список id через запятую."})
+        if len(ids) > settings.RECIPE_MULTI_GET_MAX_IDS:
+            raise ValidationError(
+                {"ids": f"Не больше {settings.RECIPE_MULTI_GET_MAX_IDS} id за запрос."}
+            )
+
+        position = {pk: index for index, pk in enumerate(ids)}
+        rows = sorted(
+            self.filter_queryset(recipe_rows()).filter(pk__in=ids),
+            key=lambda row: position[row["id"]],
+        )
+        return Response(self.get_read_model().build(rows))
+
+    def retrieve(self, request, *args, **kwargs):
+        rows = self.filter_queryset(recipe_rows()).filter(pk=kwargs["pk"])
+        recipes = self.get_read_model().build(rows)
+        if not recipes:
+            raise Http404
+        return Response(recipes[0])
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context["request"] = self.request
         return context
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
-
-    def _handle_subscription(self, request, pk, model, serializer_class, action_name):
-        recipe = get_object_or_404(Recipe, pk=pk)
+        recipe = serializer.save(author=self.request.user)
+        events.publish(
+            events.author_topic(recipe.author_id),
+            {"type": events.RECIPE, "recipe": recipe.pk, "author": recipe.author_id},
+        )
 
+    def _handle_subscription(
+        self, request, pk, model, membership, action_name, exists_message
+    ):
         if request.method == "POST":
-            data = {
-                "user": request.user.id,
-                "recipe": recipe.id,
-            }
-            serializer = serializer_class(
-                data=data, context=self.get_serializer_context()
+            recipe = model.objects.add(request.user, pk)
+            if recipe is None:
+                raise Http404
+            if not recipe.added:
+                return Response(
+                    {"error": exists_message}, status=status.HTTP_400_BAD_REQUEST
+                )
+            memberships.touch(request.user, membership)
+            events.publish(
+                events.user_topic(request.user.pk),
+                {"type": membership, "recipe": recipe.pk, "active": True},
+            )
+            serializer = ShortRecipeSerializer(
+                recipe, context=self.get_serializer_context()
             )
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         if request.method == "DELETE":
             deleted_count, _ = model.objects.filter(
-                user=request.user, recipe=recipe
+                user=request.user, recipe_id=pk
             ).delete()
             if deleted_count == 0:
+                get_object_or_404(Recipe, pk=pk)
                 return Response(
                     {"error": f"Рецепт не был в {action_name}"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
+            memberships.touch(request.user, membership)
+            events.publish(
+                events.user_topic(request.user.pk),
+                {"type": membership, "recipe": int(pk), "active": False},
+            )
             return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -234,7 +394,12 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def favorite(self, request, pk=None):
         return self._handle_subscription(
-            request, pk, Favorite, FavoriteSerializer, "избранное"
+            request,
+            pk,
+            Favorite,
+            memberships.FAVORITES,
+            "избранное",
+            "Рецепт уже в избранном",
         )
 
     @action(
@@ -242,7 +407,12 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def shopping_cart(self, request, pk=None):
         return self._handle_subscription(
-            request, pk, ShoppingCart, ShoppingCartSerializer, "список покупок"
+            request,
+            pk,
+            ShoppingCart,
+            memberships.SHOPPING_CART,
+            "список покупок",
+            "Рецепт уже в списке покупок",
         )
 
     def _generate_shopping_list_buffer(self, ingredients):
@@ -287,13 +457,35 @@ class RecipeViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=["get"])
     def get_link(self, request, pk=None):
         recipe = self.get_object()
-
-        recipe_url = request.build_absolute_uri(f"/recipes/{recipe.id}/")
+        if not recipe.short_code:
+            recipe.short_code = make_short_code()
+            Recipe.objects.filter(pk=recipe.pk, short_code__isnull=True).update(
+                short_code=recipe.short_code
+            )
+            recipe.refresh_from_db(fields=["short_code"])
 
         return Response(
             {
-                "short-link": recipe_url,
+                "short-link": request.build_absolute_uri(f"/s/{recipe.short_code}"),
                 "recipe_id": recipe.id,
                 "recipe_name": recipe.name,
             }
         )
+
+
+class EventTicketView(APIView):
+    """Билет для подключения EventSource к /api/events/?ticket=."""
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        return Response(
+            {
+                "ticket": events.make_ticket(request.user),
+                "expires_in": settings.EVENTS["TICKET_MAX_AGE"],
+            }
+        )
+
+
+def metrics(request):
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE_LATEST)
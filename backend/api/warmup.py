@@ -0,0 +1,38 @@
+from django.apps import apps
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches
+from django.db import connections
+from django.http import Http404
+from django.urls import get_resolver
+from django.utils import translation
+
+
+def warm_up():
+    """Прогревает процесс gunicorn до fork воркеров (preload_app).
+
+    Всё, что загружено здесь, воркеры получают копией при fork и не
+    тратят на это первые запросы. Соединения с БД и кешем закрываются,
+    чтобы воркеры не делили сокеты мастера.
+    """
+    from api import spa
+
+    resolver = get_resolver()
+    resolver.url_patterns
+    resolver.reverse_dict
+
+    translation.activate(settings.LANGUAGE_CODE)
+    translation.gettext("This field is required.")
+    translation.deactivate()
+
+    try:
+        spa.shell.get()
+    except Http404:
+        pass
+
+    try:
+        ContentType.objects.get_for_models(*apps.get_models())
+    finally:
+        connections.close_all()
+        for cache in caches.all():
+            cache.close()
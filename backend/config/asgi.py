@@ -3,5 +3,10 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+os.environ.setdefault("SERVER_MODE", "asgi")
 
 application = get_asgi_application()
+
+from api.events import EventStream  # noqa: E402 после django.setup()
+
+application = EventStream(application)
@@ -11,6 +11,12 @@ SECRET_KEY = os.environ.get("SECRET_KEY", "secret_key")
 
 DEBUG = os.environ.get("DEBUG", "False").lower() == "true"
 
+API_DOCS_ENABLED = os.environ.get("API_DOCS_ENABLED", str(DEBUG)).lower() == "true"
+
+# wsgi или asgi; config/asgi.py выставляет asgi сам. Под ASGI медиа и
+# короткие ссылки обслуживаются асинхронными вьюхами.
+SERVER_MODE = os.environ.get("SERVER_MODE", "wsgi")
+
 ALLOWED_HOSTS = ["*"]
 
 INSTALLED_APPS = [
@@ -25,22 +31,32 @@ INSTALLED_APPS = [
     "rest_framework.authtoken",
     "djoser",
     "django_filters",
-    "drf_yasg",
     "api.apps.ApiConfig",
     "users.apps.UsersConfig",
     "recipes.apps.RecipesConfig",
 ]
 
+if API_DOCS_ENABLED:
+    INSTALLED_APPS.append("drf_yasg")
+
 MIDDLEWARE = [
+    "api.middleware.MetricsMiddleware",
+    "api.middleware.QueryInspectorMiddleware",
+    "api.middleware.CompressionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
+    "api.middleware.SiteSessionMiddleware",
     "django.middleware.common.CommonMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
-    "django.contrib.messages.middleware.MessageMiddleware",
-    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "api.middleware.SiteAuthenticationMiddleware",
+    "api.middleware.SiteMessageMiddleware",
+    "api.middleware.SiteXFrameOptionsMiddleware",
+    "api.middleware.MemoryTracingMiddleware",
+    "api.middleware.ProfilingMiddleware",
 ]
 
+# Префикс API, для которого middleware Site* не выполняются.
+LEAN_API_PREFIX = "/api/"
+
 CORS_ALLOW_ALL_ORIGINS = True
 
 CORS_ALLOW_CREDENTIALS = True
@@ -101,11 +117,26 @@ USE_L10N = True
 
 USE_TZ = True
 
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", "foodgram"),
+    }
+}
+
 STATIC_URL = "/static/"
 STATIC_ROOT = os.path.join(BASE_DIR, "static")
 
+OPENAPI_SCHEMA_PATH = os.path.join(BASE_DIR, "api", "static", "api", "openapi.json")
+SWAGGER_SETTINGS = {"SPEC_URL": STATIC_URL + "api/openapi.json"}
+REDOC_SETTINGS = {"SPEC_URL": STATIC_URL + "api/openapi.json"}
+
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+MEDIA_ACCEL_REDIRECT = os.getenv("MEDIA_ACCEL_REDIRECT", "")
+MEDIA_CACHE_MAX_AGE = int(os.getenv("MEDIA_CACHE_MAX_AGE", 30 * 24 * 60 * 60))
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
@@ -116,10 +147,102 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "api.authentication.CachedTokenAuthentication",
+    ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.ORJSONRenderer",
+        "api.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.parsers.ORJSONParser",
+        "api.parsers.MessagePackParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
     ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 6,
+    "DEFAULT_THROTTLE_CLASSES": ["api.throttling.TokenBucketThrottle"],
+    "DEFAULT_THROTTLE_RATES": {
+        "download_shopping_cart": os.getenv("THROTTLE_SHOPPING_CART", "10/min"),
+        "recipe_create": os.getenv("THROTTLE_RECIPE_CREATE", "20/hour"),
+        "subscriptions": os.getenv("THROTTLE_SUBSCRIPTIONS", "60/min"),
+    },
+}
+
+TOKEN_CACHE_TIMEOUT = int(os.getenv("TOKEN_CACHE_TIMEOUT", 300))
+TOKEN_CACHE_LOCAL_TIMEOUT = int(os.getenv("TOKEN_CACHE_LOCAL_TIMEOUT", 10))
+TOKEN_CACHE_LOCAL_SIZE = int(os.getenv("TOKEN_CACHE_LOCAL_SIZE", 1024))
+
+RECIPE_CACHE_TIMEOUT = int(os.getenv("RECIPE_CACHE_TIMEOUT", 3600))
+RECIPE_MULTI_GET_MAX_IDS = 100
+MEMBERSHIP_CACHE_TIMEOUT = int(os.getenv("MEMBERSHIP_CACHE_TIMEOUT", 600))
+
+SHORT_LINK_CACHE_TIMEOUT = int(os.getenv("SHORT_LINK_CACHE_TIMEOUT", 86400))
+SHORT_LINK_LOCAL_TIMEOUT = int(os.getenv("SHORT_LINK_LOCAL_TIMEOUT", 3600))
+SHORT_LINK_LOCAL_SIZE = int(os.getenv("SHORT_LINK_LOCAL_SIZE", 10000))
+SHORT_LINK_MAX_AGE = 86400
+
+# Server-Sent Events (только SERVER_MODE=asgi). Под WSGI по умолчанию
+# NullBackend: лишний pg_notify на каждую запись не нужен, слушать некому.
+# api.events.LocalBackend доставляет события лишь внутри процесса: для
+# разработки и одного воркера.
+EVENTS = {
+    "PATH": "/api/events/",
+    "BACKEND": os.getenv(
+        "EVENTS_BACKEND",
+        (
+            "api.events.PostgresBackend"
+            if SERVER_MODE == "asgi"
+            else "api.events.NullBackend"
+        ),
+    ),
+    "CHANNEL": "foodgram_events",
+    "QUEUE_SIZE": 100,
+    "HEARTBEAT": 15,
+    "RETRY": 5000,
+    "TICKET_MAX_AGE": 60,
+}
+
+COMPRESSION = {
+    "PATH_PREFIX": "/api/",
+    "MIN_SIZE": int(os.getenv("COMPRESSION_MIN_SIZE", 1024)),
+    "LEVELS": {"zstd": 3, "br": 4, "gzip": 6},
+    "TYPES": (
+        "application/json",
+        "application/msgpack",
+        "text/plain",
+    ),
+    "CACHE_SIZE": 256,
+    "CACHE_MAX_BODY": int(os.getenv("COMPRESSION_CACHE_MAX_BODY", 32 * 1024)),
+    "CACHE_TIMEOUT": 300,
+}
+
+QUERY_BUDGET = {
+    "PATH_PREFIX": "/api/",
+    "DEFAULT": int(os.getenv("QUERY_BUDGET_DEFAULT", 10)),
+    "VIEWS": {
+        "GET recipes-list": 9,
+        "GET recipes-detail": 5,
+        "GET users-list": 3,
+        "GET users-subscriptions": 4,
+        "PATCH recipes-detail": 12,
+    },
+    "N_PLUS_ONE_THRESHOLD": int(os.getenv("N_PLUS_ONE_THRESHOLD", 5)),
+    "RAISE": False,
+}
+
+PROFILING = {
+    "DIR": os.getenv("PROFILING_DIR", os.path.join(BASE_DIR, "profiles")),
+    "MAX_FILES": int(os.getenv("PROFILING_MAX_FILES", 200)),
+    "INTERVAL": float(os.getenv("PROFILING_INTERVAL", 0.005)),
+}
+
+MEMORY_TRACING = {
+    "ENABLED": os.getenv("MEMORY_TRACING", "False").lower() == "true",
+    "SAMPLE_RATE": float(os.getenv("MEMORY_TRACING_SAMPLE_RATE", 0.01)),
+    "FRAMES": int(os.getenv("MEMORY_TRACING_FRAMES", 10)),
+    "TOP": int(os.getenv("MEMORY_TRACING_TOP", 10)),
 }
 
 SIMPLE_JWT = {
@@ -148,6 +271,7 @@ if "test" in sys.argv or "pytest" in sys.argv[0] or os.environ.get("CI"):
     DEBUG = False
     SECRET_KEY = os.environ.get("SECRET_KEY", "test-secret-key-for-ci")
     ALLOWED_HOSTS = ["*"]
+    QUERY_BUDGET["RAISE"] = True
 
     SILENCED_SYSTEM_CHECKS = [
         "security.W003",
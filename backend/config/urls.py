@@ -2,23 +2,22 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path, re_path
-from django.views.generic import TemplateView
-from django.views.static import serve
+
+from api.media import serve_media, serve_media_async
+from api.shortlinks import short_link_redirect, short_link_redirect_async
+from api.spa import spa_shell
+
+asgi = settings.SERVER_MODE == "asgi"
+media_view = serve_media_async if asgi else serve_media
+short_link_view = short_link_redirect_async if asgi else short_link_redirect
 
 urlpatterns = [
-    re_path(
-        r"^media/(?P<path>.*)$",
-        serve,
-        {
-            "document_root": settings.MEDIA_ROOT,
-        },
-    ),
+    re_path(r"^media/(?P<path>.*)$", media_view),
     path("admin/", admin.site.urls),
     path("api/", include("api.urls")),
-    path("", TemplateView.as_view(template_name="index.html")),
-    re_path(r"^.*$", TemplateView.as_view(template_name="index.html")),
+    path("s/<str:code>", short_link_view, name="short-link"),
+    re_path(r"^.*$", spa_shell),
 ]
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
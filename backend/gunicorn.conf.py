@@ -0,0 +1,63 @@
+import multiprocessing
+import os
+import sys
+
+from prometheus_client import multiprocess
+
+cpu_count = multiprocessing.cpu_count()
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+# SERVER_MODE=asgi запускает config.asgi на воркерах uvicorn (см. run.sh),
+# иначе config.wsgi на gthread.
+asgi = os.getenv("SERVER_MODE", "wsgi") == "asgi"
+worker_class = os.getenv(
+    "GUNICORN_WORKER_CLASS", "uvicorn.workers.UvicornWorker" if asgi else "gthread"
+)
+workers = int(os.getenv("GUNICORN_WORKERS", cpu_count * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 200))
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+# Heartbeat воркеров в tmpfs: запись в overlayfs контейнера может тормозить.
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
+# Кеши процесса не видят инвалидаций из других воркеров: версии
+# memberships, токены и фрагменты рецептов разъехались бы между ними.
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def on_starting(server):
+    if server.cfg.workers < 2:
+        return
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    from django.conf import settings
+
+    backend = settings.CACHES["default"]["BACKEND"]
+    if backend in PROCESS_LOCAL_CACHES:
+        server.log.error(
+            "CACHE_BACKEND=%s не общий для %d воркеров; укажите memcached "
+            "(CACHE_BACKEND, CACHE_LOCATION) или GUNICORN_WORKERS=1",
+            backend,
+            server.cfg.workers,
+        )
+        sys.exit(1)
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        from api.warmup import warm_up
+
+        warm_up()
+
+
+def child_exit(server, worker):
+    multiprocess.mark_process_dead(worker.pid)
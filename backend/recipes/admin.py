@@ -1,5 +1,7 @@
 from django.contrib import admin
-from django.db.models import Count
+from django.utils import timezone
+
+from core.paginators import EstimatedCountPaginator
 
 from .models import Favorite, Ingredient, Recipe, RecipeIngredient, ShoppingCart
 
@@ -7,6 +9,10 @@ from .models import Favorite, Ingredient, Recipe, RecipeIngredient, ShoppingCart
 class RecipeIngredientInline(admin.TabularInline):
     model = RecipeIngredient
     extra = 1
+    autocomplete_fields = ("ingredient",)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("ingredient")
 
 
 @admin.register(Ingredient)
@@ -14,27 +20,31 @@ class IngredientAdmin(admin.ModelAdmin):
     list_display = ("name", "measurement_unit")
     search_fields = ("name",)
     list_filter = ("measurement_unit",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
     list_display = ("name", "author")
     list_display_links = ("name",)
+    list_select_related = ("author",)
     search_fields = ("name", "author__email")
     list_filter = ("created",)
+    autocomplete_fields = ("author",)
     inlines = (RecipeIngredientInline,)
     readonly_fields = ("favorites_count_display",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
-    def get_queryset(self, request):
-        qs = super().get_queryset(request)
-        return (
-            qs.select_related("author")
-            .prefetch_related("recipe_ingredients__ingredient")
-            .annotate(favorites_count=Count("in_favorites"))
-        )
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        Recipe.objects.filter(pk=form.instance.pk).update(updated=timezone.now())
 
     def favorites_count_display(self, obj):
-        return obj.favorites_count or 0
+        if obj.pk is None:
+            return 0
+        return obj.in_favorites.count()
 
     favorites_count_display.short_description = "В избранном"
 
@@ -43,13 +53,21 @@ class RecipeAdmin(admin.ModelAdmin):
 class FavoriteAdmin(admin.ModelAdmin):
     list_display = ("user", "recipe", "created")
     list_display_links = ("user", "recipe")
+    list_select_related = ("user", "recipe")
     search_fields = ("user__email", "recipe__name")
     list_filter = ("created",)
+    autocomplete_fields = ("user", "recipe")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
     list_display = ("user", "recipe", "created")
     list_display_links = ("user", "recipe")
+    list_select_related = ("user", "recipe")
     search_fields = ("user__email", "recipe__name")
     list_filter = ("created",)
+    autocomplete_fields = ("user", "recipe")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -2,3 +2,6 @@ MIN_COOKING_TIME = 1
 MAX_COOKING_TIME = 1440
 MIN_INGREDIENT_AMOUNT = 1
 MAX_INGREDIENT_AMOUNT = 10000
+
+SHORT_CODE_ALPHABET = "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+SHORT_CODE_LENGTH = 7
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import IntegrityError, transaction
+
+from recipes.models import Recipe, make_short_code
+
+
+class Command(BaseCommand):
+    help = "Проставляет коды коротких ссылок рецептам без кода"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        filled = 0
+        while True:
+            recipes = list(
+                Recipe.objects.filter(short_code__isnull=True).only("pk")[
+                    : options["batch_size"]
+                ]
+            )
+            if not recipes:
+                break
+            for recipe in recipes:
+                recipe.short_code = make_short_code()
+            try:
+                with transaction.atomic():
+                    Recipe.objects.bulk_update(recipes, ["short_code"])
+            except IntegrityError:
+                # Совпадение кода: пачка будет выбрана и заполнена заново.
+                continue
+            filled += len(recipes)
+        self.stdout.write(f"Заполнено кодов: {filled}")
@@ -0,0 +1,124 @@
+import hashlib
+import os
+import sys
+import tarfile
+from contextlib import ExitStack
+
+import orjson
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe, RecipeIngredient
+
+RECIPE_FIELDS = (
+    "id",
+    "name",
+    "text",
+    "cooking_time",
+    "image",
+    "created",
+    "author__email",
+    "author__username",
+    "author__first_name",
+    "author__last_name",
+)
+
+
+class Command(BaseCommand):
+    help = "Выгружает рецепты с авторами и ингредиентами в NDJSON и картинки в tar"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output", default="-", help="Файл NDJSON, по умолчанию stdout"
+        )
+        parser.add_argument("--images", help="tar-архив для картинок рецептов")
+        parser.add_argument("--chunk-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        with ExitStack() as stack:
+            if options["output"] == "-":
+                output = sys.stdout.buffer
+            else:
+                output = stack.enter_context(open(options["output"], "wb"))
+            images = None
+            if options["images"]:
+                images = stack.enter_context(
+                    tarfile.open(options["images"], "w|", format=tarfile.PAX_FORMAT)
+                )
+
+            exported = 0
+            rows = (
+                Recipe.objects.order_by("pk")
+                .values(*RECIPE_FIELDS)
+                .iterator(chunk_size=options["chunk_size"])
+            )
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) == options["chunk_size"]:
+                    exported += self.write_chunk(chunk, output, images)
+                    chunk = []
+            exported += self.write_chunk(chunk, output, images)
+
+        self.stderr.write(f"Выгружено рецептов: {exported}")
+
+    def write_chunk(self, chunk, output, images):
+        if not chunk:
+            return 0
+        ingredients = {row["id"]: [] for row in chunk}
+        for recipe_id, name, unit, amount in (
+            RecipeIngredient.objects.filter(recipe_id__in=ingredients)
+            .order_by("pk")
+            .values_list(
+                "recipe_id",
+                "ingredient__name",
+                "ingredient__measurement_unit",
+                "amount",
+            )
+        ):
+            ingredients[recipe_id].append(
+                {"name": name, "measurement_unit": unit, "amount": amount}
+            )
+
+        for row in chunk:
+            image = row["image"]
+            if images is not None and image:
+                image = self.write_image(images, image)
+            record = {
+                "id": row["id"],
+                "author": {
+                    "email": row["author__email"],
+                    "username": row["author__username"],
+                    "first_name": row["author__first_name"],
+                    "last_name": row["author__last_name"],
+                },
+                "name": row["name"],
+                "text": row["text"],
+                "cooking_time": row["cooking_time"],
+                "image": image,
+                "created": row["created"],
+                "ingredients": ingredients[row["id"]],
+            }
+            output.write(orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE))
+        return len(chunk)
+
+    def write_image(self, images, name):
+        """Кладёт картинку в архив под именем по содержимому.
+
+        Одинаковые картинки не дублируются при импорте, а имена не
+        конфликтуют с файлами, уже лежащими в хранилище получателя.
+        """
+        if not default_storage.exists(name):
+            self.stderr.write(f"Нет файла картинки: {name}")
+            return name
+        with default_storage.open(name, "rb") as file:
+            digest = hashlib.sha1()
+            for chunk in iter(lambda: file.read(64 * 1024), b""):
+                digest.update(chunk)
+            info = tarfile.TarInfo(
+                f"recipes/{digest.hexdigest()}{os.path.splitext(name)[1]}"
+            )
+            info.size = file.tell()
+            file.seek(0)
+            images.addfile(info, file)
+        return info.name
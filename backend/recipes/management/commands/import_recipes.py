@@ -0,0 +1,155 @@
+import os
+import tarfile
+
+import orjson
+from django.contrib.auth.hashers import make_password
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, make_short_code
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Загружает рецепты из NDJSON, выгруженного export_recipes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл NDJSON")
+        parser.add_argument("--images", help="tar-архив с картинками рецептов")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--state",
+            help="Файл с позицией для продолжения, по умолчанию <path>.state",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Начать с начала файла, игнорируя сохранённую позицию",
+        )
+
+    def handle(self, *args, **options):
+        if options["images"]:
+            self.import_images(options["images"])
+
+        state_path = options["state"] or f"{options['path']}.state"
+        offset = 0
+        if not options["restart"] and os.path.exists(state_path):
+            with open(state_path) as file:
+                offset = int(file.read() or 0)
+            self.stderr.write(f"Продолжение с позиции {offset}")
+
+        self.ingredients = {
+            (name, unit): pk
+            for pk, name, unit in Ingredient.objects.values_list(
+                "pk", "name", "measurement_unit"
+            ).iterator()
+        }
+        imported = skipped = 0
+        with open(options["path"], "rb") as file:
+            file.seek(offset)
+            batch = []
+            while True:
+                line = file.readline()
+                if line.strip():
+                    batch.append(orjson.loads(line))
+                if batch and (not line or len(batch) == options["batch_size"]):
+                    created, batch_skipped = self.import_batch(batch)
+                    imported += created
+                    skipped += batch_skipped
+                    batch = []
+                    self.save_state(state_path, file.tell())
+                if not line:
+                    break
+
+        self.stderr.write(f"Загружено рецептов: {imported}, пропущено: {skipped}")
+
+    def import_images(self, path):
+        saved = 0
+        with tarfile.open(path, "r|") as archive:
+            for member in archive:
+                if not member.isfile() or default_storage.exists(member.name):
+                    continue
+                default_storage.save(member.name, archive.extractfile(member))
+                saved += 1
+        self.stderr.write(f"Сохранено картинок: {saved}")
+
+    def save_state(self, path, offset):
+        with open(f"{path}.tmp", "w") as file:
+            file.write(str(offset))
+        os.replace(f"{path}.tmp", path)
+
+    @transaction.atomic
+    def import_batch(self, records):
+        authors = self.resolve_authors(records)
+        existing = set(
+            Recipe.objects.filter(
+                author_id__in=authors.values(),
+                name__in={record["name"] for record in records},
+            ).values_list("author_id", "name")
+        )
+
+        recipes, created, ingredients = [], [], []
+        for record in records:
+            author_id = authors.get(record["author"]["email"])
+            if author_id is None:
+                self.stderr.write(
+                    f"Рецепт {record['id']}: автор {record['author']['email']} "
+                    f"не создан, username занят"
+                )
+                continue
+            if (author_id, record["name"]) in existing:
+                continue
+            resolved = self.resolve_ingredients(record)
+            if resolved is None:
+                continue
+            existing.add((author_id, record["name"]))
+            recipes.append(
+                Recipe(
+                    author_id=author_id,
+                    name=record["name"],
+                    text=record["text"],
+                    cooking_time=record["cooking_time"],
+                    image=record["image"],
+                    short_code=make_short_code(),
+                )
+            )
+            created.append(parse_datetime(record["created"]))
+            ingredients.append(resolved)
+
+        Recipe.objects.bulk_create(recipes)
+        # auto_now_add перезаписывает created при вставке.
+        for recipe, value in zip(recipes, created):
+            recipe.created = value
+        Recipe.objects.bulk_update(recipes, ["created"])
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient_id=pk, amount=amount)
+            for recipe, resolved in zip(recipes, ingredients)
+            for pk, amount in resolved
+        )
+        return len(recipes), len(records) - len(recipes)
+
+    def resolve_authors(self, records):
+        authors = {record["author"]["email"]: record["author"] for record in records}
+        User.objects.bulk_create(
+            (
+                User(**author, password=make_password(None))
+                for author in authors.values()
+            ),
+            ignore_conflicts=True,
+        )
+        return dict(User.objects.filter(email__in=authors).values_list("email", "pk"))
+
+    def resolve_ingredients(self, record):
+        resolved = []
+        for item in record["ingredients"]:
+            pk = self.ingredients.get((item["name"], item["measurement_unit"]))
+            if pk is None:
+                self.stderr.write(
+                    f"Рецепт {record['id']}: нет ингредиента "
+                    f"{item['name']} ({item['measurement_unit']}) в справочнике"
+                )
+                return None
+            resolved.append((pk, item["amount"]))
+        return resolved
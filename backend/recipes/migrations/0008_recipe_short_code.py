@@ -0,0 +1,25 @@
+# Generated by Django 3.2.16 on 2026-10-19 08:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0007_recipe_updated"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="short_code",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                max_length=7,
+                null=True,
+                unique=True,
+                verbose_name="Код короткой ссылки",
+            ),
+        ),
+    ]
@@ -1,5 +1,8 @@
+import secrets
+
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.utils import timezone
 
 from users.models import User
 
@@ -8,9 +11,17 @@ from .constants import (
     MAX_INGREDIENT_AMOUNT,
     MIN_COOKING_TIME,
     MIN_INGREDIENT_AMOUNT,
+    SHORT_CODE_ALPHABET,
+    SHORT_CODE_LENGTH,
 )
 
 
+def make_short_code():
+    return "".join(
+        secrets.choice(SHORT_CODE_ALPHABET) for _ in range(SHORT_CODE_LENGTH)
+    )
+
+
 class Ingredient(models.Model):
     name = models.CharField("Название", max_length=200)
     measurement_unit = models.CharField("Единица измерения", max_length=200)
@@ -46,6 +57,15 @@ class Recipe(models.Model):
         verbose_name="Время приготовления (в минутах)",
     )
     created = models.DateTimeField(auto_now_add=True, verbose_name="Дата публикации")
+    updated = models.DateTimeField(auto_now=True, verbose_name="Дата изменения")
+    short_code = models.CharField(
+        max_length=SHORT_CODE_LENGTH,
+        unique=True,
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Код короткой ссылки",
+    )
 
     class Meta:
         verbose_name = "Рецепт"
@@ -55,6 +75,11 @@ class Recipe(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if not self.short_code:
+            self.short_code = make_short_code()
+        super().save(*args, **kwargs)
+
 
 class RecipeIngredient(models.Model):
     recipe = models.ForeignKey(
@@ -86,6 +111,29 @@ class RecipeIngredient(models.Model):
         )
 
 
+class UserRecipeRelationQuerySet(models.QuerySet):
+    def add(self, user, recipe_id):
+        """Возвращает рецепт (или None) с флагом added за один запрос."""
+        sql = f"""
+            WITH recipe AS (
+                SELECT id, name, image, cooking_time
+                FROM {Recipe._meta.db_table}
+                WHERE id = %s
+            ), inserted AS (
+                INSERT INTO {self.model._meta.db_table} (user_id, recipe_id, created)
+                SELECT %s, id, %s FROM recipe
+                ON CONFLICT DO NOTHING
+                RETURNING recipe_id
+            )
+            SELECT recipe.*, EXISTS (SELECT 1 FROM inserted) AS added
+            FROM recipe
+        """
+        recipes = Recipe.objects.using(self.db).raw(
+            sql, [recipe_id, user.pk, timezone.now()]
+        )
+        return next(iter(recipes), None)
+
+
 class UserRecipeRelation(models.Model):
     user = models.ForeignKey(
         User,
@@ -101,6 +149,8 @@ class UserRecipeRelation(models.Model):
     )
     created = models.DateTimeField(auto_now_add=True, verbose_name="Дата добавления")
 
+    objects = UserRecipeRelationQuerySet.as_manager()
+
     class Meta:
         abstract = True
         constraints = [
@@ -2,4 +2,10 @@
 python manage.py migrate --noinput
 python manage.py collectstatic --noinput
 cp -r static /static/
-gunicorn config.wsgi:application --bind 0.0.0.0:8000
\ No newline at end of file
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus}
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+# exec: SIGTERM от docker доходит до мастера gunicorn и мягко завершает
+# воркеры (graceful_timeout). SIGHUP перечитывает конфигурацию и по очереди
+# перезапускает воркеры; новый код с preload_app подхватывается рестартом.
+exec gunicorn "config.${SERVER_MODE:-wsgi}:application" --config gunicorn.conf.py
\ No newline at end of file
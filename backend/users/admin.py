@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 
+from core.paginators import EstimatedCountPaginator
+
 from .models import User
 
 
@@ -9,5 +11,7 @@ class CustomUserAdmin(UserAdmin):
     list_display = ("email", "username", "first_name", "last_name")
     list_display_links = ("email", "username")
     search_fields = ("email", "username")
-    list_filter = ("email", "username")
+    list_filter = ("is_staff", "is_active")
     ordering = ("id",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -1,5 +1,7 @@
+from django.apps import apps
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db import models
+from django.utils import timezone
 
 from .constants import (
     AVATAR_UPLOAD_TO,
@@ -75,6 +77,49 @@ class User(AbstractUser):
         return None
 
 
+class SubscriptionQuerySet(models.QuerySet):
+    def add(self, user, author_id, recipes_limit=None):
+        """Возвращает автора (или None) с флагом added за один запрос.
+
+        recipes_count и recipes_preview заполняются тем же запросом.
+        """
+        recipe_table = apps.get_model("recipes", "Recipe")._meta.db_table
+        sql = f"""
+            WITH author AS (
+                SELECT id, email, username, first_name, last_name, avatar
+                FROM {User._meta.db_table}
+                WHERE id = %s
+            ), inserted AS (
+                INSERT INTO {self.model._meta.db_table} (user_id, author_id, created)
+                SELECT %s, id, %s FROM author
+                ON CONFLICT DO NOTHING
+                RETURNING author_id
+            )
+            SELECT
+                author.*,
+                EXISTS (SELECT 1 FROM inserted) AS added,
+                TRUE AS is_subscribed,
+                (
+                    SELECT COUNT(*) FROM {recipe_table}
+                    WHERE author_id = author.id
+                ) AS recipes_count,
+                COALESCE((
+                    SELECT json_agg(preview) FROM (
+                        SELECT id, name, image, cooking_time
+                        FROM {recipe_table}
+                        WHERE author_id = author.id
+                        ORDER BY created DESC
+                        LIMIT %s
+                    ) AS preview
+                ), '[]') AS recipes_preview
+            FROM author
+        """
+        authors = User.objects.using(self.db).raw(
+            sql, [author_id, user.pk, timezone.now(), recipes_limit]
+        )
+        return next(iter(authors), None)
+
+
 class Subscription(models.Model):
     user = models.ForeignKey(
         User,
@@ -87,6 +132,8 @@ class Subscription(models.Model):
     )
     created = models.DateTimeField("Дата подписки", auto_now_add=True)
 
+    objects = SubscriptionQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Подписка"
         verbose_name_plural = "Подписки"